@@ -0,0 +1,296 @@
+"""Streaming analytics over telemetry rows: derived signals, rolling windows, EWMA and alarms.
+
+Rows (epoch ms plus the nine CSV_COLUMNS values) are processed in chunks with NumPy, and
+no state grows with the length of the stream:
+
+- Derived signals: electrical power (bus voltage x current), phase-current imbalance
+  (spread of the windowed mean |U|, |V|, |W| over their average, 0 until the first
+  window is full) and SOC slope over the window.
+- RollingWindow: mean, std, min and max over the last `width` rows for every signal.
+  The stream is cut into blocks of `width` rows (van Herk/Gil-Werman): a window is the
+  suffix of the previous block plus the prefix of the current one, and suffix aggregates
+  are computed once per completed block, so each row costs O(1) whatever the width.
+  Sums restart every block, so they never drift.
+- Ewma: exponentially weighted mean, evaluated in closed form over sub-blocks.
+- AlarmRule: thresholds with hysteresis on any signal or statistic, reported on the row
+  where they are raised or cleared.
+
+AnalyticsFeed takes rows one at a time from the replay or receive path and runs the
+analysis on batches of them; it shares the batching timer (TimedBatch) with FrameBatcher.
+"""
+import math
+
+import numpy as np
+
+from common import CSV_COLUMNS, TimedBatch, format_time_ms
+from metrics import METRICS
+
+ANALYTICS_WINDOW = 100  # Rows per rolling window, 10 seconds of 10 Hz data
+EWMA_ALPHA = 0.05  # Weight of the newest row in the EWMA
+ANALYTICS_BATCH = 1000  # Rows analysed together...
+ANALYTICS_MAX_DELAY = 0.1  # ...or after this many seconds, so alarms are never later than this
+
+DERIVED = ["power_kw", "phase_imbalance", "soc_slope"]  # soc_slope is in % per minute
+SIGNALS = CSV_COLUMNS[1:] + DERIVED
+STATISTICS = ["mean", "std", "min", "max", "ewma"]
+COLUMN = {name: i for i, name in enumerate(CSV_COLUMNS[1:])}
+
+# SIGNAL>VALUE~HYSTERESIS rules, quiet on healthy data from sensor-data-generator.py
+DEFAULT_ALARMS = [
+    "Bus_Voltage.mean<84~1",
+    "Bus_Current>125~5",
+    "SOC<15~1",
+    "phase_imbalance>0.5~0.05",
+]
+
+
+class RollingWindow:
+    """Mean, std, min and max over the last `width` rows of a (rows, columns) stream."""
+
+    def __init__(self, width, columns):
+        self.width = width
+        self.block = np.empty((width, columns))  # Rows of the current block so far
+        self.fill = 0
+        self.seen_block = False  # A complete previous block exists
+        # Running aggregates of the current block
+        self.prefix = self._identity(columns)
+        # Aggregates of previous-block rows j.. for j = 0..width (row width is the empty suffix)
+        self.suffix = {name: np.repeat(value[None], width + 1, axis=0) for name, value in self._identity(columns).items()}
+
+    @staticmethod
+    def _identity(columns):
+        return {
+            "sum": np.zeros(columns),
+            "sq": np.zeros(columns),
+            "min": np.full(columns, np.inf),
+            "max": np.full(columns, -np.inf),
+        }
+
+    def update(self, x):
+        """Window statistics ending at every row of x; returns a dict of (rows, columns) arrays."""
+        out = {name: np.empty_like(x) for name in ("mean", "std", "min", "max")}
+        pos = 0
+        while pos < len(x):
+            take = min(self.width - self.fill, len(x) - pos)
+            segment = x[pos:pos + take]
+            offsets = slice(self.fill + 1, self.fill + take + 1)  # Previous-block suffix of each row's window
+            prefix = self.prefix
+            sums = np.cumsum(segment, axis=0) + prefix["sum"]
+            squares = np.cumsum(segment * segment, axis=0) + prefix["sq"]
+            lows = np.minimum(np.minimum.accumulate(segment, axis=0), prefix["min"])
+            highs = np.maximum(np.maximum.accumulate(segment, axis=0), prefix["max"])
+
+            counts = np.arange(self.fill + 1, self.fill + take + 1)[:, None]
+            if self.seen_block:
+                counts = np.full_like(counts, self.width)
+            window_sum = sums + self.suffix["sum"][offsets]
+            mean = window_sum / counts
+            out["mean"][pos:pos + take] = mean
+            variance = (squares + self.suffix["sq"][offsets]) / counts - mean * mean
+            out["std"][pos:pos + take] = np.sqrt(np.maximum(variance, 0.0))
+            out["min"][pos:pos + take] = np.minimum(lows, self.suffix["min"][offsets])
+            out["max"][pos:pos + take] = np.maximum(highs, self.suffix["max"][offsets])
+
+            self.block[self.fill:self.fill + take] = segment
+            self.fill += take
+            self.prefix = {"sum": sums[-1], "sq": squares[-1], "min": lows[-1], "max": highs[-1]}
+            if self.fill == self.width:
+                self._close_block()
+            pos += take
+        return out
+
+    def _close_block(self):
+        reverse = self.block[::-1]
+        self.suffix["sum"][:-1] = np.cumsum(reverse, axis=0)[::-1]
+        self.suffix["sq"][:-1] = np.cumsum(reverse * reverse, axis=0)[::-1]
+        self.suffix["min"][:-1] = np.minimum.accumulate(reverse, axis=0)[::-1]
+        self.suffix["max"][:-1] = np.maximum.accumulate(reverse, axis=0)[::-1]
+        self.seen_block = True
+        self.fill = 0
+        self.prefix = self._identity(self.block.shape[1])
+
+
+class Ewma:
+    """y = alpha * x + (1 - alpha) * previous y, for every row of a chunk at once.
+
+    Within a sub-block y_t = d^(t+1) * (y_prev + alpha * sum(x_i / d^(i+1))), with d = 1 - alpha.
+    Sub-blocks are kept short enough that d^-length stays far from overflowing.
+    """
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError("EWMA alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.decay = 1.0 - alpha
+        self.value = None
+        self.step = max(int(100 / -math.log10(self.decay)), 1) if self.decay else None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x[0].copy()  # Start from the first row instead of from zero
+        if not self.step:  # alpha = 1: no memory at all
+            self.value = x[-1].copy()
+            return x.copy()
+        out = np.empty_like(x)
+        for start in range(0, len(x), self.step):
+            segment = x[start:start + self.step]
+            powers = self.decay ** np.arange(1, len(segment) + 1)[:, None]
+            out[start:start + len(segment)] = powers * (self.value + self.alpha * np.cumsum(segment / powers, axis=0))
+            self.value = out[start + len(segment) - 1].copy()
+        return out
+
+
+class AlarmRule:
+    """SIGNAL>VALUE or SIGNAL<VALUE, optionally ~HYSTERESIS; SIGNAL may end in .mean, .max, ..."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        for op in (">", "<"):
+            if op in spec:
+                signal, _, limit = spec.partition(op)
+                break
+        else:
+            raise ValueError(f"Invalid alarm '{spec}': expected SIGNAL>VALUE or SIGNAL<VALUE")
+        self.signal, self.op = signal.strip(), op
+        limit, _, hysteresis = limit.partition("~")
+        try:
+            self.threshold = float(limit)
+            self.hysteresis = float(hysteresis) if hysteresis else 0.0
+        except ValueError:
+            raise ValueError(f"Invalid alarm '{spec}': threshold and hysteresis must be numbers")
+        base, _, statistic = self.signal.partition(".")
+        if base not in SIGNALS or (statistic and statistic not in STATISTICS):
+            raise ValueError(f"Invalid alarm '{spec}': unknown signal '{self.signal}' "
+                             f"(one of {', '.join(SIGNALS)}, optionally with .{'/.'.join(STATISTICS)})")
+        self.active = False
+
+    def evaluate(self, values):
+        """Return (raised, cleared) row indices for a chunk of the rule's signal."""
+        if self.op == ">":
+            trip, reset = values > self.threshold, values <= self.threshold - self.hysteresis
+        else:
+            trip, reset = values < self.threshold, values >= self.threshold + self.hysteresis
+        # The state at each row is set by the latest trip or reset at or before it
+        event = np.where(trip, 1, np.where(reset, 0, -1))
+        latest = np.maximum.accumulate(np.where(event >= 0, np.arange(len(values)), -1))
+        state = np.where(latest >= 0, event[np.maximum(latest, 0)] == 1, self.active)
+        before = np.concatenate([[self.active], state[:-1]])
+        self.active = bool(state[-1])
+        return np.flatnonzero(state & ~before), np.flatnonzero(~state & before)
+
+
+class StreamAnalytics:
+    """Derived signals, rolling statistics, EWMA and alarms for a stream of telemetry rows."""
+
+    def __init__(self, window=ANALYTICS_WINDOW, alpha=EWMA_ALPHA, alarms=DEFAULT_ALARMS):
+        self.window = window
+        self.phases = RollingWindow(window, 3)  # Mean |I| per phase, for the imbalance
+        self.stats = RollingWindow(window, len(SIGNALS))
+        self.ewma = Ewma(alpha)
+        self.alarms = [rule if isinstance(rule, AlarmRule) else AlarmRule(rule) for rule in alarms]
+        self.soc_history = np.empty((0, 2))  # (time, SOC) of the last `window` rows, for the slope
+        self.rows = 0
+        self.latest = {}
+        self.alarm_count = 0
+
+    def derive(self, epoch_ms, values):
+        """(rows, len(DERIVED)) array of the derived signals."""
+        power = values[:, COLUMN["Bus_Voltage"]] * values[:, COLUMN["Bus_Current"]] / 1000
+        phase_means = self.phases.update(np.abs(values[:, [COLUMN["Current_U"], COLUMN["Current_V"], COLUMN["Current_W"]]]))["mean"]
+        average = phase_means.mean(axis=1)
+        imbalance = np.divide(phase_means.max(axis=1) - phase_means.min(axis=1), average,
+                              out=np.zeros_like(average), where=average > 0)
+        imbalance[:max(self.window - self.rows, 0)] = 0.0  # Not meaningful until a whole window is in
+
+        # SOC change against the row `window` rows earlier (or the first row seen)
+        history = np.vstack([self.soc_history, np.column_stack([epoch_ms, values[:, COLUMN["SOC"]]])])
+        earlier = np.maximum(np.arange(len(self.soc_history), len(history)) - self.window, 0)
+        minutes = (history[len(self.soc_history):, 0] - history[earlier, 0]) / 60000
+        change = history[len(self.soc_history):, 1] - history[earlier, 1]
+        slope = np.divide(change, minutes, out=np.zeros_like(change), where=minutes > 0)
+        self.soc_history = history[-self.window:]
+        return np.column_stack([power, imbalance, slope])
+
+    def update(self, epoch_ms, values):
+        """Analyse a chunk of rows; returns alarm events as (epoch ms, rule, value, raised)."""
+        epoch_ms = np.asarray(epoch_ms, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(epoch_ms), len(CSV_COLUMNS) - 1)
+        signals = np.hstack([values, self.derive(epoch_ms, values)])
+        series = {"": signals, **self.stats.update(signals), "ewma": self.ewma.update(signals)}
+        self.rows += len(epoch_ms)
+
+        events = []
+        for rule in self.alarms:
+            base, _, statistic = rule.signal.partition(".")
+            column = series[statistic][:, SIGNALS.index(base)]
+            raised, cleared = rule.evaluate(column)
+            for row, is_raised in sorted([(row, True) for row in raised] + [(row, False) for row in cleared]):
+                events.append((int(epoch_ms[row]), rule, float(column[row]), is_raised))
+        self.alarm_count += sum(1 for event in events if event[3])
+        events.sort(key=lambda event: event[0])
+
+        self.latest = {name: float(series[""][-1, i]) for i, name in enumerate(SIGNALS)}
+        for statistic in STATISTICS:
+            self.latest.update((f"{name}.{statistic}", float(series[statistic][-1, i])) for i, name in enumerate(SIGNALS))
+        return events
+
+    def summary(self):
+        """Compact text of the newest derived values, for the status line."""
+        if not self.latest:
+            return "no telemetry yet"
+        latest = self.latest
+        return (f"⚡ {latest['power_kw']:.2f} kW (avg {latest['power_kw.mean']:.2f}) | "
+                f"imbalance {latest['phase_imbalance']:.0%} | SOC {latest['soc_slope']:+.2f} %/min | "
+                f"RPM {latest['RPM.min']:.0f}-{latest['RPM.max']:.0f} | alarms {self.alarm_count}")
+
+
+def report_alarm(event):
+    epoch_ms, rule, value, raised = event
+    when = format_time_ms(epoch_ms)
+    if raised:
+        METRICS.inc("alarms")
+        print(f"\n🚨 {when} {rule.spec}: {rule.signal} = {value:.3f}")
+    else:
+        print(f"\n✅ {when} cleared {rule.spec}: {rule.signal} = {value:.3f}")
+
+
+class AnalyticsFeed(TimedBatch):
+    """Collect rows one at a time and run StreamAnalytics on batches of them.
+
+    A batch is analysed once it holds max_rows rows or max_delay seconds after its first
+    row arrived (see TimedBatch), so alarms are reported promptly even when rows trickle
+    in. Alarm events go to on_alarm (report_alarm by default).
+    """
+
+    def __init__(self, analytics=None, max_rows=ANALYTICS_BATCH, max_delay=ANALYTICS_MAX_DELAY, on_alarm=report_alarm):
+        self.analytics = analytics or StreamAnalytics()
+        self.max_rows = max_rows
+        self.on_alarm = on_alarm
+        self.times = []
+        self.rows = []
+        super().__init__(max_delay)
+
+    def feed(self, epoch_ms, row):
+        with self.cond:
+            self._arm()
+            self.times.append(epoch_ms)
+            self.rows.append(row)
+            if len(self.rows) >= self.max_rows:
+                self._flush()
+
+    def summary(self):
+        with self.cond:
+            return self.analytics.summary()
+
+    def close(self):
+        self._stop_timer()
+        with self.cond:
+            self._flush()
+
+    def _process(self):
+        if not self.rows:
+            return
+        times, rows = self.times, self.rows
+        self.times, self.rows = [], []
+        for event in self.analytics.update(times, rows):
+            self.on_alarm(event)
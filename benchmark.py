@@ -0,0 +1,338 @@
+"""Throughput and latency benchmarks for the codec, telemetry encodings and the send path.
+
+Covers encode_packet/decode_packet for every DATA_TYPES code and for payloads of
+different sizes, bulk encode_values/decode_values, FrameDecoder, JSON versus binary versus delta telemetry, CSV row conversion and
+replay sources, and loopback send/receive through a local MockServer. Results are
+printed as a table and can be saved as JSON; --compare checks a run against saved
+results and fails if anything got slower than the threshold.
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json        # exit status 1 on a regression
+    python benchmark.py --quick --filter codec
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+from cli import (
+    CSV_FILE, DATA_TYPES, TELEMETRY_TYPE, AsyncConnection, FrameBatcher, FrameDecoder,
+    decode_packet, decode_telemetry, decode_values, encode_command, encode_json_rows, encode_packet,
+    encode_telemetry, encode_values, encode_telemetry_frames, format_time_ms, iter_replay_chunks,
+    prepare_rows, synthesize_rows, telemetry_payload,
+)
+from delta import DeltaDecoder, encode_stream_rows
+from mock_server import MockServer
+
+# A typical command value per data type; 1 and 2 have no command encoding, so they get a raw int16
+SAMPLE_VALUES = {
+    3: "28.613939,77.209023",
+    4: "45.67",
+    5: "90.50",
+    6: "1200",
+    7: "45",
+    8: "87",
+    9: "150",
+    10: "80.25",
+    11: "2.50",
+    12: "65",
+}
+PAYLOAD_SIZES = (1, 16, 64, 255)  # 255 is the largest payload a frame can carry
+BULK_VALUES = 10000  # Values per encode_values/decode_values call
+TELEMETRY_ROWS = 10000
+STREAM_FRAMES = 10000  # Frames per FrameDecoder and loopback run
+LATENCY_SAMPLES = 1000
+COMPARE_THRESHOLD = 0.10  # Fractional slowdown that counts as a regression
+LOOPBACK_TIMEOUT = 30.0
+
+
+def measure(func, repeat):
+    """Seconds per call of func: timeit's autorange picks the loop count, the best of repeat runs wins."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def result(seconds, items=1, unit="ops", **extra):
+    """One benchmark result; per_second is the figure compared between runs."""
+    return {"per_second": items / seconds, "unit": unit, "ns_per_item": seconds / items * 1e9, **extra}
+
+
+def sample_payload(type_code):
+    if type_code in SAMPLE_VALUES:
+        return encode_command(type_code, SAMPLE_VALUES[type_code])
+    return (1).to_bytes(2, "big", signed=True)
+
+
+def bench_codec(repeat):
+    results = {}
+    cases = [(name, code, sample_payload(code)) for code, name in DATA_TYPES.items()]
+    cases += [(f"size_{size}", 3, b"x" * size) for size in PAYLOAD_SIZES]
+    for name, code, payload in cases:
+        frame = encode_packet(code, payload)
+        results[f"codec.encode.{name}"] = result(measure(lambda: encode_packet(code, payload), repeat), unit="frames")
+        results[f"codec.decode.{name}"] = result(measure(lambda: decode_packet(frame), repeat), unit="frames")
+
+    stream = b"".join(encode_packet(code, payload) for _, code, payload in cases) * (STREAM_FRAMES // len(cases))
+    frames = len(cases) * (STREAM_FRAMES // len(cases))
+    chunks = [stream[i:i + 65536] for i in range(0, len(stream), 65536)]
+
+    def decode_stream():
+        decoder = FrameDecoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+
+    results["codec.frame_decoder"] = result(measure(decode_stream, repeat), frames, "frames")
+
+    import numpy as np
+
+    for code in (5, 6):  # One fixed-point and one int16 type
+        values = np.resize([float(SAMPLE_VALUES[code])], BULK_VALUES)
+        blob = encode_values(code, values)
+        name = DATA_TYPES[code]
+        results[f"codec.encode_values.{name}"] = result(measure(lambda: encode_values(code, values), repeat), BULK_VALUES, "frames")
+        results[f"codec.decode_values.{name}"] = result(measure(lambda: decode_values(code, blob), repeat), BULK_VALUES, "frames")
+    return results
+
+
+def bench_telemetry(repeat):
+    import json as json_module
+
+    epoch_ms, values = synthesize_rows(TELEMETRY_ROWS)
+    times = [format_time_ms(ms) for ms in epoch_ms.tolist()]
+    json_frames = encode_json_rows(times, values)
+    binary_frames = encode_telemetry_frames(epoch_ms, values)
+    time_str, row = times[0], values[0].tolist()
+    json_document, binary_payload = json_frames[0], binary_frames[0][4:-2]
+
+    delta_packets = [packet for packet in encode_stream_rows(epoch_ms, values) if packet]
+    delta_payloads = [payload for packet in delta_packets for _, payload in FrameDecoder().feed(packet)]
+
+    def decode_delta():
+        decoder = DeltaDecoder()
+        for payload in delta_payloads:
+            decoder.feed(payload)
+
+    rows = len(times)
+    return {
+        "telemetry.encode_row.json": result(measure(lambda: json_module.dumps(telemetry_payload(time_str, row)), repeat),
+                                            unit="rows", bytes_per_row=len(json_document)),
+        "telemetry.encode_row.binary": result(measure(lambda: encode_packet(TELEMETRY_TYPE, encode_telemetry(time_str, row)), repeat),
+                                              unit="rows", bytes_per_row=len(binary_frames[0])),
+        "telemetry.encode_block.json": result(measure(lambda: encode_json_rows(times, values), repeat), rows, "rows"),
+        "telemetry.encode_block.binary": result(measure(lambda: encode_telemetry_frames(epoch_ms, values), repeat), rows, "rows"),
+        "telemetry.encode_block.delta": result(measure(lambda: encode_stream_rows(epoch_ms, values), repeat), rows, "rows",
+                                               bytes_per_row=sum(map(len, delta_packets)) / rows),
+        "telemetry.decode_row.json": result(measure(lambda: json_module.loads(json_document), repeat), unit="rows"),
+        "telemetry.decode_row.binary": result(measure(lambda: decode_telemetry(binary_payload), repeat), unit="rows"),
+        "telemetry.decode_block.delta": result(measure(decode_delta, repeat), rows, "rows"),
+    }
+
+
+def bench_csv(repeat):
+    import pandas as pd
+
+    if not os.path.exists(CSV_FILE):
+        print(f"⚠️ {CSV_FILE} not found, skipping CSV benchmarks")
+        return {}
+    df = pd.read_csv(CSV_FILE)
+    rows = len(df)
+
+    def replay_chunks(path):
+        for _ in iter_replay_chunks(path):
+            pass
+
+    results = {
+        "csv.prepare_rows.json": result(measure(lambda: prepare_rows(df, "json"), repeat), rows, "rows"),
+        "csv.prepare_rows.binary": result(measure(lambda: prepare_rows(df, "binary"), repeat), rows, "rows"),
+        "csv.replay.csv": result(measure(lambda: replay_chunks(CSV_FILE), repeat), rows, "rows"),
+    }
+    from columnar import convert
+
+    with tempfile.TemporaryDirectory() as directory:
+        capture = os.path.join(directory, "bench.mzc")
+        convert(CSV_FILE, capture)
+        results["csv.replay.columnar"] = result(measure(lambda: replay_chunks(capture), repeat), rows, "rows")
+    return results
+
+
+class Loopback:
+    """A MockServer on a background event loop with one AsyncConnection to it."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = MockServer()
+        self.call(self.server.start("127.0.0.1", 0))
+        sock = socket.create_connection(("127.0.0.1", self.server.port))
+        self.client = AsyncConnection(sock, reconnect=False)
+        self.wait_for(lambda: self.server.transports)
+        self.transport = next(iter(self.server.transports))
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def wait_for(self, condition):
+        deadline = time.perf_counter() + LOOPBACK_TIMEOUT
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("loopback benchmark timed out")
+            time.sleep(0.0005)
+
+    def received(self):
+        totals = self.server.totals()
+        return totals["frames"] + totals["telemetry"]
+
+    def close(self):
+        self.client.close()
+        self.server.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def bench_loopback(repeat):
+    epoch_ms, values = synthesize_rows(STREAM_FRAMES)
+    frames = encode_telemetry_frames(epoch_ms, values)
+    blob = b"".join(frames)
+    results = {}
+    loopback = Loopback()
+    try:
+        def send():
+            expected = loopback.received() + len(frames)
+            started = time.perf_counter()
+            batcher = FrameBatcher(loopback.client)
+            for frame in frames:
+                batcher.sendall(frame)
+            batcher.close()
+            loopback.wait_for(lambda: loopback.received() >= expected)
+            return time.perf_counter() - started
+
+        seconds = min(send() for _ in range(repeat))
+        results["loopback.send.binary"] = result(seconds, len(frames), "frames", mb_per_second=len(blob) / seconds / 1e6)
+
+        counted = [0]
+        arrived = threading.Event()
+
+        def on_frame(type_code, payload):
+            counted[0] += 1
+            arrived.set()
+
+        loopback.client.set_frame_handler(on_frame)
+
+        def receive():
+            counted[0] = 0
+            started = time.perf_counter()
+            loopback.loop.call_soon_threadsafe(loopback.transport.write, blob)
+            loopback.wait_for(lambda: counted[0] >= len(frames))
+            return time.perf_counter() - started
+
+        seconds = min(receive() for _ in range(repeat))
+        results["loopback.receive.binary"] = result(seconds, len(frames), "frames", mb_per_second=len(blob) / seconds / 1e6)
+
+        # One frame at a time from the server's loop to the client's handler
+        latencies = []
+        for frame in frames[:LATENCY_SAMPLES]:
+            arrived.clear()
+            started = time.perf_counter()
+            loopback.loop.call_soon_threadsafe(loopback.transport.write, frame)
+            if not arrived.wait(LOOPBACK_TIMEOUT):
+                raise TimeoutError("loopback benchmark timed out")
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        median = percentile(latencies, 0.5)
+        results["loopback.latency"] = result(median, unit="frames", p50_us=median * 1e6,
+                                             p99_us=percentile(latencies, 0.99) * 1e6)
+    finally:
+        loopback.client.set_frame_handler(None)
+        loopback.close()
+    return results
+
+
+SUITES = {
+    "codec": bench_codec,
+    "telemetry": bench_telemetry,
+    "csv": bench_csv,
+    "loopback": bench_loopback,
+}
+
+
+def compare(results, baseline, threshold):
+    """Print the change against baseline per benchmark; returns the names that regressed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        ratio = current["per_second"] / previous["per_second"]
+        regressed = ratio < 1 - threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{'❌' if regressed else '✅'} {name:40s} {ratio:7.2f}x  ({previous['per_second']:,.0f} → {current['per_second']:,.0f} {current['unit']}/s)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Mazout CLI codec and send path")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the fastest counts (default 5)")
+    parser.add_argument("--quick", action="store_true", help="one run per benchmark, for a fast smoke check")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=COMPARE_THRESHOLD,
+                        help=f"slowdown that fails --compare, as a fraction (default {COMPARE_THRESHOLD:g})")
+    args = parser.parse_args(argv)
+    repeat = 1 if args.quick else args.repeat
+
+    results = {}
+    for suite, bench in SUITES.items():
+        prefix = args.filter.split(".")[0]
+        if prefix in SUITES and prefix != suite:
+            continue  # e.g. --filter codec.decode only needs the codec suite
+        print(f"⏱ Running {suite} benchmarks...")
+        results.update((name, value) for name, value in bench(repeat).items() if args.filter in name)
+
+    for name, value in results.items():
+        extra = "  ".join(f"{key}={value[key]:.1f}" for key in value if key not in ("per_second", "unit", "ns_per_item"))
+        print(f"{name:40s} {value['per_second']:>14,.0f} {value['unit']}/s {value['ns_per_item']:>12,.0f} ns  {extra}")
+
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"📝 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than {args.compare}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
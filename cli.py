@@ -1,34 +1,74 @@
-import datetime
+import argparse
+import asyncio
+import io
+import os
 import socket
+import subprocess
 import sys
 import time
-import select
 import threading
-import pandas as pd
-import json
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import struct
 from collections import deque
-import numpy as np
+
+from common import (
+    CHUNK_ROWS, CSV_COLUMNS, DELTA_TYPE, TELEMETRY_TYPE, TIME_FORMAT, TimedBatch, encode_packet,
+    format_time_ms, format_times_ms, iter_csv_chunks, parse_rows, parse_time_ms, xor_checksum,
+)
+from metrics import METRICS, Histogram, StatusLine, serve_metrics
+from recorder import Recorder
+
+# pandas, numpy and matplotlib are imported inside the functions that use them:
+# together they take well over a second to load, and connecting to send a few
+# commands (or running on a gateway without a display) needs none of them.
 
 SERVER_IP = "13.232.19.209"
 SERVER_PORT = 3050
 CSV_FILE = "sensor_data.csv"
+STARTUP_TARGET_MS = 150  # Budget for importing cli.py, checked by --startup-check
+
+# No plots when asked to, or when there is no display to put them on
+HEADLESS = os.environ.get("MAZOUT_HEADLESS") == "1" or (
+    sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+)
+LOG_ROWS = True  # Print every sent/received row; --quiet shows a periodic status line instead
+ALARMS = None  # --alarm rules checked by the replay/receive analytics, None for analytics.DEFAULT_ALARMS
+REPLAY_SPEED = 1.0  # 1 = recorded rate, 10 = ten times faster, 0 = as fast as possible
+MAX_REPLAY_LAG = 1.0  # Seconds behind schedule before the replay stops trying to catch up
+
+LOAD_RATE = 10.0  # Frames per second sent by each simulated controller in --load mode
+LOAD_DURATION = 60.0  # Seconds each simulated controller keeps sending
+LOAD_MAX_ROWS = 100000  # Rows of the replay file shared by all simulated controllers
+SYNTHETIC_ROWS = 36000  # Rows of generated data when --synthetic is used (one hour at 10 Hz)
+CONNECT_CONCURRENCY = 100  # Simultaneous connection attempts, keeps the server's backlog from overflowing
+RECV_SIZE = 65536  # Bytes per recv(), frames are reassembled by FrameDecoder
+
+WRITE_HIGH_WATER = 256 * 1024  # Outbound bytes buffered before sendall() blocks
+WRITE_LOW_WATER = 64 * 1024
+INBOX_SIZE = 1000  # Inbound frames kept while not in "Receive Data"
+CLOSE_TIMEOUT = 10  # Seconds to let buffered outbound data drain when disconnecting
+RECONNECT_MIN_DELAY = 0.5  # Backoff before the first reconnect attempt, doubled after each failure...
+RECONNECT_MAX_DELAY = 30.0  # ...up to this many seconds
+OUTBOUND_QUEUE_BYTES = 8 * 1024 * 1024  # Data kept while the link is down, oldest dropped beyond this
+KEEPALIVE_IDLE = 10  # Seconds of silence before the first TCP keepalive probe
+KEEPALIVE_INTERVAL = 5  # Seconds between probes
+KEEPALIVE_COUNT = 3  # Unanswered probes before the link is declared dead
+TCP_NODELAY = True  # Batches are already coalesced, so don't let Nagle hold them back
+
+BATCH_MAX_BYTES = 16384  # Flush the outbound batch once it holds this many bytes...
+BATCH_MAX_FRAMES = 256   # ...or this many frames...
+BATCH_MAX_DELAY = 0.005  # ...or this many seconds after its first frame
+
+FRAME_SYNC = b"\xaa\xbb"
+FRAME_OVERHEAD = 6  # Sync (2) + type + length + checksum + trailer
 
 stop_listening = False  # Global flag to stop listening
 stop_sending = False
 
-PLOT_POINTS = 100  # Number of points to show in the plot
-voltage_data = deque(maxlen=PLOT_POINTS)
-current_data = deque(maxlen=PLOT_POINTS)
-soc_data = deque(maxlen=PLOT_POINTS)
-throttle_data = deque(maxlen=PLOT_POINTS)
-rpm_data = deque(maxlen=PLOT_POINTS)
-current_u_data = deque(maxlen=PLOT_POINTS)
-current_v_data = deque(maxlen=PLOT_POINTS)
-current_w_data = deque(maxlen=PLOT_POINTS)
-timestamps = deque(maxlen=PLOT_POINTS)
-plot_lock = threading.Lock()  # Thread safety for plotting
+PLOT_POINTS = 400  # Min/max buckets drawn per line, however much history is shown
+PLOT_HISTORY_ROWS = 1 << 16  # Rows kept for the dashboard (~1.8 hours at 10 Hz)
+PLOT_MIN_WINDOW = 100  # Rows shown when zoomed in all the way
+PLOT_FPS = 20  # Dashboard redraws per second, independent of the send rate
+PLOT_LABEL_INTERVAL = 1.0  # Seconds between full redraws that refresh the time labels
 
 DATA_TYPES = {
     1: "immobilize",
@@ -44,8 +84,54 @@ DATA_TYPES = {
     11: "throttle",
     12: "motorTemperature",
 }
+DATA_TYPE_CODES = {name.lower(): code for code, name in DATA_TYPES.items()}
+
+# How the value of each command type is carried: (kind, signed, scale). "text" is
+# UTF-8, "int" one int16, "fixed" the typed text split at the decimal point into a
+# whole byte and a byte holding the digits after it (12.13 -> 0C 0D, -1.50 -> FF 32).
+# That byte is only hundredths when two digits were typed ('12.5' and '12.05' are
+# both 0C 05), so numbers are encoded, and payloads decoded, as if typed with
+# log10(scale) decimals. Types without an entry (immobilize, rpmPreset) can't be
+# sent and are shown as a raw unsigned int.
+DATA_SCHEMA = {
+    3: ("text", False, 1),
+    4: ("fixed", True, 100),
+    5: ("fixed", True, 100),
+    6: ("int", True, 1),
+    7: ("int", True, 1),
+    8: ("int", True, 1),
+    9: ("int", True, 1),
+    10: ("fixed", True, 100),
+    11: ("fixed", True, 100),
+    12: ("int", True, 1),
+}
+
+# Binary telemetry record: one CSV row packed as epoch milliseconds followed by
+# the nine measurements as float32, sent as a regular frame of TELEMETRY_TYPE.
+# The CSV time has no zone, so it is stored as-is (milliseconds since 1970-01-01 00:00).
+TELEMETRY_RECORD = struct.Struct(">Q9f")
+TELEMETRY_FRAME_FIELDS = [  # NumPy dtype of a whole framed record
+    ("header", "u1", 4),
+    ("time", ">u8"),
+    ("values", ">f4", 9),
+    ("checksum", "u1"),
+    ("trailer", "u1"),
+]
+
+# Same document as json.dumps(telemetry_payload(...)), filled in with % for speed. This only
+# holds for what parse_rows() lets through: finite values and times in TIME_FORMAT, which
+# never need escaping.
+JSON_TEMPLATE = (
+    '{"time": "%s", "motor_data": {"busVoltage": %r, "busCurrent": %r, "rpm": %r, "torque": %r}, '
+    '"phase_currents": {"u": %r, "v": %r, "w": %r}, "system_status": {"throttle_voltage": %r, "soc": %r}}'
+)
+
+WIRE_FORMATS = ("json", "binary", "delta")
+WIRE_FORMAT = "json"  # Default for "Send Data from File"
+COMPRESSION = "zlib"  # Block compression of the delta format: none, zlib or lz4
 
 def connect_to_server():
+    """Open a socket to the server; returns None (after reporting why) if that fails."""
     try:
         client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client.connect((SERVER_IP, SERVER_PORT))
@@ -53,56 +139,723 @@ def connect_to_server():
         return client
     except Exception as e:
         print(f"❌ Failed to connect to server: {e}")
-        sys.exit(1)
-
-def encode_packet(index, payload):
-    if isinstance(payload, str):
-        payload_bytes = payload.encode()
-    elif isinstance(payload, int):
-        payload_bytes = payload.to_bytes(2, byteorder='big', signed=True)
-    elif isinstance(payload, bytes):  # Handle bytes directly
-        payload_bytes = payload
-    else:
-        raise ValueError("Payload must be int, str, or bytes")
-    
-    payload_length = len(payload_bytes)
-    buffer = bytearray(5 + payload_length)
-    buffer[0], buffer[1] = 0xAA, 0xBB
-    buffer[2], buffer[3] = index, payload_length
-    buffer[4:4+payload_length] = payload_bytes
-    buffer[-1] = 0xCC
-    
-    checksum = 0
-    for i in range(len(buffer) - 1):
-        checksum ^= buffer[i]
-    buffer.insert(-1, checksum)
-    
-    return bytes(buffer)
+        return None
 
 def decode_packet(buffer):
-    if len(buffer) < 5 or buffer[0] != 0xAA or buffer[1] != 0xBB:
+    if len(buffer) < FRAME_OVERHEAD or buffer[0] != 0xAA or buffer[1] != 0xBB:
         print("❌ Invalid packet.")
         return None
-    
+
     type_code, length = buffer[2], buffer[3]
-    payload = buffer[4:4 + length]
-    checksum = buffer[4 + length]
-    calc_checksum = 0
-    for i in range(4 + length):
-        calc_checksum ^= buffer[i]
-    
-    if checksum != calc_checksum:
+    if len(buffer) < FRAME_OVERHEAD + length or buffer[5 + length] != 0xCC:
+        print("❌ Invalid packet.")
+        return None
+    if buffer[4 + length] != xor_checksum(buffer[:4 + length]):
         print("❌ Checksum mismatch.")
         return None
 
+    return decode_payload(type_code, bytes(buffer[4:4 + length]))
+
+def decode_payload(type_code, payload):
+    """Describe one frame payload; a malformed one gets an "error" and its raw bytes as hex instead of raising."""
+    if type_code == TELEMETRY_TYPE:
+        if len(payload) != TELEMETRY_RECORD.size:
+            return {"dataType": "telemetry", "payload": payload.hex(), "error": f"expected {TELEMETRY_RECORD.size} bytes, got {len(payload)}"}
+        return {"dataType": "telemetry", "payload": decode_telemetry(payload)}
+    if type_code == DELTA_TYPE:
+        from delta import describe_fragment
+
+        return {"dataType": "telemetryDelta", "payload": describe_fragment(payload)}
+
     data_type = DATA_TYPES.get(type_code, "unknown")
-    
+    codec = CODECS.get(type_code)
+    if codec is None:
+        return {"dataType": data_type, "payload": int.from_bytes(payload, "big")}
+    try:
+        return {"dataType": data_type, "payload": codec.decode(payload)}
+    except ValueError as e:
+        return {"dataType": data_type, "payload": payload.hex(), "error": str(e)}
+
+def telemetry_payload(time_str, values):
+    """Build the JSON document for one row; values follow CSV_COLUMNS[1:]."""
+    bus_voltage, bus_current, rpm, torque, current_u, current_v, current_w, throttle, soc = values
     return {
-        "dataType": data_type,
-        "payload": payload.decode("utf-8") if type_code == 3 else int.from_bytes(payload, "big")
+        "time" : time_str,
+        "motor_data" : {
+            "busVoltage" : bus_voltage,
+            "busCurrent" : bus_current,
+            "rpm" : rpm,
+            "torque" : torque,
+        },
+        "phase_currents": {
+            "u": current_u,
+            "v": current_v,
+            "w": current_w
+        },
+        "system_status": {
+            "throttle_voltage": throttle,
+            "soc": soc
+        }
     }
 
+def encode_telemetry(time_str, values):
+    """Pack one row into a TELEMETRY_RECORD payload (44 bytes instead of ~300 of JSON)."""
+    return TELEMETRY_RECORD.pack(parse_time_ms(time_str), *values)
+
+def decode_telemetry(payload):
+    """Unpack a TELEMETRY_RECORD payload into the same document the JSON format sends."""
+    epoch_ms, *values = TELEMETRY_RECORD.unpack(payload)
+    return telemetry_payload(format_time_ms(epoch_ms), [round(value, 3) for value in values])
+
+def encode_telemetry_block(epoch_ms, values):
+    """Build the binary telemetry frames for many rows at once, returned back to back as bytes.
+
+    epoch_ms is an int64 array and values an (n, 9) float array in CSV_COLUMNS[1:] order.
+    The header, payload, checksum and trailer of every frame are filled in as whole columns
+    of a structured array, so there is no per-row Python work at all.
+    """
+    import numpy as np
+
+    frame_dtype = np.dtype(TELEMETRY_FRAME_FIELDS)
+    frames = np.empty(len(epoch_ms), dtype=frame_dtype)
+    frames["header"] = (0xAA, 0xBB, TELEMETRY_TYPE, TELEMETRY_RECORD.size)
+    frames["time"] = epoch_ms
+    frames["values"] = values
+    frames["trailer"] = 0xCC
+    raw = frames.view(np.uint8).reshape(len(frames), frame_dtype.itemsize)
+    frames["checksum"] = np.bitwise_xor.reduce(raw[:, :-2], axis=1)
+    return frames.tobytes()
+
+def encode_telemetry_frames(epoch_ms, values):
+    """Like encode_telemetry_block(), split into one bytes object per frame."""
+    blob = encode_telemetry_block(epoch_ms, values)
+    size = FRAME_OVERHEAD + TELEMETRY_RECORD.size
+    return [blob[i:i + size] for i in range(0, len(blob), size)]
+
+def encode_json_rows(times, values):
+    """Render one JSON document per row; values is an (n, 9) float array."""
+    return [(JSON_TEMPLATE % (time_str, *row)).encode() for time_str, row in zip(times, values.tolist())]
+
+def encode_rows(times, epoch_ms, values, wire_format):
+    """One packet per row; in the delta format most are b"" and a block's last row carries the block."""
+    if wire_format == "binary":
+        return encode_telemetry_frames(epoch_ms, values)
+    if wire_format == "delta":
+        from delta import encode_stream_rows
+
+        return encode_stream_rows(epoch_ms, values, COMPRESSION)
+    return encode_json_rows(times, values)
+
+def prepare_rows(df, wire_format):
+    """Convert a DataFrame (or a chunk of one) to times, plot rows and ready-to-send packets.
+
+    Every column is converted once with NumPy, so the replay loop only has to pace
+    and write instead of building a pandas Series and calling float() per cell.
+    """
+    times, epoch_ms, values = parse_rows(df)
+    return times, epoch_ms.tolist(), values.tolist(), encode_rows(times, epoch_ms, values, wire_format)
+
+class ReplayScheduler:
+    """Pace a replay from the recorded Time column on the monotonic clock.
+
+    Each row gets an absolute deadline, start + (time - first time) / speed, so the time
+    spent encoding, plotting and printing is absorbed by the next wait instead of piling
+    up as drift. speed=0 sends as fast as possible. If the sender falls more than max_lag
+    seconds behind (a stalled link, a paused terminal) the schedule is moved forward
+    instead of bursting to catch up.
+    """
+
+    def __init__(self, speed=REPLAY_SPEED, max_lag=MAX_REPLAY_LAG):
+        self.speed = speed
+        self.max_lag = max_lag
+        self.start = None
+        self.first_ms = None
+        self.last_ms = None
+        self.rows = 0
+        self.skipped = 0.0  # Seconds of schedule given up after falling behind
+
+    def wait(self, epoch_ms):
+        """Sleep until the row recorded at epoch_ms is due."""
+        now = time.monotonic()
+        if self.start is None:
+            self.start, self.first_ms = now, epoch_ms
+        self.last_ms = epoch_ms
+        self.rows += 1
+        if self.speed <= 0:
+            return
+        delay = self.start + (epoch_ms - self.first_ms) / 1000 / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay > self.max_lag:
+            self.start -= delay
+            self.skipped -= delay
+
+    def achieved_rate(self):
+        elapsed = time.monotonic() - self.start if self.start is not None else 0
+        return (self.rows - 1) / elapsed if elapsed > 0 else 0.0
+
+    def target_rate(self):
+        if self.speed <= 0:
+            return float("inf")
+        span = (self.last_ms - self.first_ms) / 1000 / self.speed if self.rows > 1 else 0
+        return (self.rows - 1) / span if span > 0 else 0.0
+
+    def report(self):
+        return f"{self.achieved_rate():.1f} rows/s (target {self.target_rate():.1f} rows/s)"
+
+class FrameDecoder:
+    """Reassemble AA BB <type> <len> <payload> <checksum> CC frames from a byte stream.
+
+    Chunks from recv() rarely line up with frame boundaries: a read can hold several
+    frames or only part of one. feed() keeps the leftover bytes in a single reusable
+    buffer and returns every complete, valid frame as a (type_code, payload) tuple.
+    Corrupted frames are skipped by searching for the next sync marker. Bytes that are
+    not part of a frame are passed to on_skipped, if given, e.g. to pick JSON telemetry
+    out of a mixed stream.
+    """
+
+    def __init__(self, on_skipped=None):
+        self.buffer = bytearray()
+        self.on_skipped = on_skipped
+        self.frames = 0           # Valid frames returned
+        self.resyncs = 0          # Times the decoder had to hunt for a new sync marker
+        self.skipped_bytes = 0    # Bytes thrown away while hunting
+        self.checksum_errors = 0
+        self.trailer_errors = 0
+
+    def feed(self, data):
+        buf = self.buffer
+        buf += data
+        frames = []
+        pos = 0
+        end = len(buf)
+        with memoryview(buf) as view:
+            while True:
+                start = buf.find(FRAME_SYNC, pos, end)
+                if start < 0:
+                    # Keep a trailing 0xAA, it may be the first half of the next sync
+                    keep = 1 if end > pos and buf[end - 1] == 0xAA else 0
+                    self._skip(view, pos, end - keep)
+                    pos = end - keep
+                    break
+                if start != pos:
+                    self._skip(view, pos, start)
+                if end - start < FRAME_OVERHEAD:
+                    pos = start
+                    break
+                length = buf[start + 3]
+                frame_end = start + FRAME_OVERHEAD + length
+                if frame_end > end:
+                    pos = start
+                    break
+                if buf[frame_end - 2] != xor_checksum(view[start:frame_end - 2]):
+                    self.checksum_errors += 1
+                    pos = start + 1
+                    continue
+                if buf[frame_end - 1] != 0xCC:
+                    self.trailer_errors += 1
+                    pos = start + 1
+                    continue
+                frames.append((buf[start + 2], bytes(view[start + 4:frame_end - 2])))
+                pos = frame_end
+        del buf[:pos]
+        self.frames += len(frames)
+        return frames
+
+    def _skip(self, view, start, stop):
+        if stop > start:
+            self.resyncs += 1
+            self.skipped_bytes += stop - start
+            if self.on_skipped:
+                self.on_skipped(bytes(view[start:stop]))
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "resyncs": self.resyncs,
+            "skipped_bytes": self.skipped_bytes,
+            "checksum_errors": self.checksum_errors,
+            "trailer_errors": self.trailer_errors,
+        }
+
+def read_frames(stream, chunk_size=65536):
+    """Decode every frame from a file-like byte stream, e.g. a captured session."""
+    decoder = FrameDecoder()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from decoder.feed(chunk)
+
+class TelemetryProtocol(asyncio.Protocol):
+    """Event-loop side of an AsyncConnection: decodes inbound frames, tracks write pauses."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.decoder = FrameDecoder()
+        self.errors_seen = (0, 0, 0)
+
+    def connection_made(self, transport):
+        transport.set_write_buffer_limits(high=WRITE_HIGH_WATER, low=WRITE_LOW_WATER)
+        self.connection.attach(transport, self)
+
+    def data_received(self, data):
+        frames = self.decoder.feed(data)
+        METRICS.inc("bytes_received", len(data))
+        METRICS.inc("frames_received", len(frames))
+        decoder = self.decoder
+        errors = (decoder.checksum_errors, decoder.trailer_errors, decoder.resyncs)
+        if errors != self.errors_seen:
+            for name, count, seen in zip(("checksum_errors", "trailer_errors", "resyncs"), errors, self.errors_seen):
+                METRICS.inc(name, count - seen)
+            self.errors_seen = errors
+        recorder = self.connection.recorder
+        if recorder and frames:
+            received = time.time()
+            for type_code, payload in frames:
+                recorder.record(type_code, payload, received)
+            recorder.schedule_flush(self.connection.loop)  # Reach the disk even if traffic stops here
+        for type_code, payload in frames:
+            self.connection.deliver(type_code, payload)
+
+    def pause_writing(self):
+        self.connection.set_paused(True)
+
+    def resume_writing(self):
+        self.connection.set_paused(False)
+
+    def connection_lost(self, exc):
+        self.connection.detach(self, exc)
+
+class AsyncConnection:
+    """Own the socket from connect_to_server() on a background asyncio event loop.
+
+    The menu keeps calling sendall() from its own thread while inbound frames are decoded
+    on the loop as soon as they arrive, so sending and receiving share one connection.
+    While connected, sendall() only blocks when the transport's write buffer is above
+    WRITE_HIGH_WATER. If the link drops, the connection is re-established in the
+    background with exponential backoff; meanwhile sendall() returns immediately and
+    queues the data (up to OUTBOUND_QUEUE_BYTES, oldest dropped first), and the queue is
+    written out ahead of anything new once the link is back.
+    """
+
+    def __init__(self, sock, address=None, reconnect=True, recorder=None):
+        self.address = address or sock.getpeername()[:2]
+        self.reconnect = reconnect
+        self.recorder = recorder  # Recorder that every inbound frame is appended to
+        self.closed = threading.Event()  # Set once the connection is gone for good
+        self.closing = False
+        self.inbox = deque(maxlen=INBOX_SIZE)  # Frames that arrived while nobody was listening
+        self.frame_handler = None
+        self.cond = threading.Condition()
+        self.connected = False
+        self.paused = False
+        self.pending = 0  # Bytes handed to the loop but not yet given to the transport
+        self.queue = deque()  # Outbound data held while the link is down
+        self.queued_bytes = 0
+        self.dropped_bytes = 0
+        self.reconnects = 0
+        self.reconnect_task = None
+        self.transport = self.protocol = None
+        METRICS.gauge("queue_bytes", lambda: self.queued_bytes)
+        METRICS.gauge("write_buffer_bytes", self.write_buffer_size)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(self._open(sock), self.loop)
+        future.result()
+
+    async def _open(self, sock=None):
+        if sock is not None:
+            return await self.loop.create_connection(lambda: TelemetryProtocol(self), sock=sock)
+        return await self.loop.create_connection(lambda: TelemetryProtocol(self), *self.address)
+
+    def attach(self, transport, protocol):
+        """Called on the loop when a (re)connection is made: configure it and flush the queue."""
+        set_keepalive(transport.get_extra_info("socket"))
+        with self.cond:
+            self.transport, self.protocol = transport, protocol
+            self.set_nodelay(TCP_NODELAY)
+            self.connected = True
+            self.paused = False
+            if self.queue:
+                print(f"\n📤 Sending {len(self.queue)} queued chunks ({self.queued_bytes} bytes)")
+            while self.queue:
+                transport.write(self.queue.popleft())
+            self.queued_bytes = 0
+            self.cond.notify_all()
+
+    def detach(self, protocol, exc):
+        """Called on the loop when the transport is lost."""
+        if protocol is not self.protocol:
+            return
+        with self.cond:
+            self.connected = False
+            self.cond.notify_all()
+            if self.closing or not self.reconnect:
+                self.closed.set()
+                return
+        METRICS.inc("disconnects")
+        print(f"\n⚠️ Connection to {self.address[0]}:{self.address[1]} lost ({exc or 'closed by server'}), reconnecting...")
+        self.reconnect_task = self.loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self.closing:
+            await asyncio.sleep(delay)
+            try:
+                await self._open()
+            except OSError:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                continue
+            self.reconnects += 1
+            METRICS.inc("reconnects")
+            print(f"\n✅ Reconnected to {self.address[0]}:{self.address[1]}")
+            return
+
+    def sendall(self, data):
+        started = time.perf_counter()
+        with self.cond:
+            while self.connected and (self.paused or self.pending > WRITE_HIGH_WATER):
+                self.cond.wait()
+            if self.closed.is_set() or self.closing:
+                raise ConnectionError("Connection closed")
+            connected = self.connected
+            if connected:
+                self.pending += len(data)
+            else:
+                self._enqueue(data)
+        if connected:
+            self.loop.call_soon_threadsafe(self._write, data)
+        METRICS.inc("bytes_sent", len(data))
+        METRICS.observe("send_seconds", time.perf_counter() - started)
+
+    def _enqueue(self, data):
+        # Called with self.cond held
+        self.queue.append(data)
+        self.queued_bytes += len(data)
+        while self.queued_bytes > OUTBOUND_QUEUE_BYTES:
+            dropped = self.queue.popleft()
+            self.queued_bytes -= len(dropped)
+            self.dropped_bytes += len(dropped)
+            METRICS.inc("dropped_bytes", len(dropped))
+
+    def _write(self, data):
+        with self.cond:
+            self.pending -= len(data)
+            if self.connected and not self.transport.is_closing():
+                self.transport.write(data)
+            else:
+                self._enqueue(data)  # The link dropped after sendall() checked it
+            if self.pending <= WRITE_LOW_WATER:
+                self.cond.notify_all()
+
+    def write_buffer_size(self):
+        """Outbound bytes accepted while connected but not yet handed to the kernel."""
+        transport = self.transport
+        buffered = transport.get_write_buffer_size() if transport and not transport.is_closing() else 0
+        return self.pending + buffered
+
+    def set_nodelay(self, enabled):
+        sock = self.transport.get_extra_info("socket")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(enabled))
+
+    def set_paused(self, paused):
+        with self.cond:
+            self.paused = paused
+            self.cond.notify_all()
+
+    def set_frame_handler(self, handler):
+        """Deliver inbound frames to handler(type_code, payload), starting with any backlog."""
+        self.loop.call_soon_threadsafe(self._set_frame_handler, handler)
+
+    def _set_frame_handler(self, handler):
+        self.frame_handler = handler
+        while handler and self.inbox:
+            self.deliver(*self.inbox.popleft())
+
+    def deliver(self, type_code, payload):
+        if not self.frame_handler:
+            self.inbox.append((type_code, payload))
+            return
+        try:
+            self.frame_handler(type_code, payload)
+        except Exception as e:  # One bad frame must not take the connection down with it
+            METRICS.inc("handler_errors")
+            print(f"❌ Error handling type {type_code} frame {payload.hex()}: {e!r}")
+
+    def _shutdown(self):
+        if self.reconnect_task:
+            self.reconnect_task.cancel()
+        if self.connected:
+            self.transport.close()
+        else:
+            self.closed.set()
+
+    def close(self):
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.closed.wait(CLOSE_TIMEOUT)  # The transport closes once its buffer is written
+        if self.queue or self.dropped_bytes:
+            print(f"⚠️ {self.queued_bytes} queued bytes were never sent, {self.dropped_bytes} bytes dropped while offline")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        METRICS.gauge("queue_bytes", None)
+        METRICS.gauge("write_buffer_bytes", None)
+        if self.recorder:
+            self.recorder.close()
+            print(f"📝 Recorded {self.recorder.records} frames to {self.recorder.path}")
+
+def set_keepalive(sock):
+    """Let the OS detect a dead link (e.g. a cellular modem dropping out) within seconds."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL), ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):  # Not every platform exposes all three
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+class FrameBatcher(TimedBatch):
+    """Coalesce outbound frames so many of them go out in a single sendall().
+
+    A batch is flushed once it holds max_bytes or max_frames, or max_delay seconds after
+    its first frame arrived (see TimedBatch). Wraps anything with a sendall() method and
+    offers the same call.
+    """
+
+    def __init__(self, client, max_bytes=BATCH_MAX_BYTES, max_frames=BATCH_MAX_FRAMES, max_delay=BATCH_MAX_DELAY):
+        self.client = client
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+        self.buffer = bytearray()
+        self.frames = 0
+        self.error = None  # Failure from a timed flush, raised on the next call
+        self.flushes = 0
+        super().__init__(max_delay)
+
+    def sendall(self, frame):
+        with self.cond:
+            self._raise_error()
+            self._arm()
+            self.buffer += frame
+            self.frames += 1
+            METRICS.inc("frames_sent")
+            if len(self.buffer) >= self.max_bytes or self.frames >= self.max_frames:
+                self._flush()
+
+    def flush(self):
+        with self.cond:
+            self._raise_error()
+            self._flush()
+
+    def close(self):
+        self._stop_timer()
+        self.flush()
+
+    def _process(self):
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.frames = 0
+        self.flushes += 1
+        self.client.sendall(data)
+
+    def _raise_error(self):
+        if self.error:
+            error, self.error = self.error, None
+            raise error
+
+    def _timer_failed(self, error):
+        self.buffer.clear()
+        self.frames = 0
+        self.error = error  # The sender sees it on its next call
+
+class ValueCodec:
+    """Encoder and decoder for the values of one DATA_SCHEMA entry, with the struct compiled once.
+
+    encode()/decode() handle one payload; encode_frames()/decode_frames() convert a whole
+    NumPy array of values to or from back-to-back frames in one call, like
+    encode_telemetry_block() does for telemetry rows.
+    """
+
+    def __init__(self, type_code, kind, signed, scale):
+        self.type_code = type_code
+        self.kind = kind
+        self.signed = signed
+        self.scale = scale
+        self.struct = {
+            "int": struct.Struct(">h" if signed else ">H"),
+            "fixed": struct.Struct(">bb" if signed else ">BB"),
+        }.get(kind)
+
+    def error(self):
+        if self.kind == "fixed":
+            return ValueError("Invalid decimal input. Please enter a valid number in the format 'whole.decimal'.")
+        low, high = (-32768, 32767) if self.signed else (0, 65535)
+        return ValueError(f"Invalid integer input. Please enter a whole number between {low} and {high}.")
+
+    def split(self, value):
+        """Whole and decimal bytes of a number, as if typed with log10(scale) decimals ('12.50', '-1.50').
+
+        The sign rides on the whole byte, so numbers between -1 and 0 can't be represented.
+        """
+        whole, decimal = divmod(round(abs(value) * self.scale), self.scale)
+        if value < 0 and not whole and decimal:
+            raise ValueError(value)
+        return (-whole if value < 0 else whole), decimal
+
+    def encode(self, value):
+        """Payload bytes for a value given as text (as typed at the prompt) or a number."""
+        if self.kind == "text":
+            return str(value).encode()
+        try:
+            if self.kind == "int":
+                return self.struct.pack(int(value) if isinstance(value, str) else round(value))
+            if isinstance(value, str):
+                whole_part, decimal_part = value.split(".")
+                return self.struct.pack(int(whole_part), int(decimal_part))
+            return self.struct.pack(*self.split(value))
+        except (ValueError, OverflowError, struct.error):
+            raise self.error() from None
+
+    def decode(self, payload):
+        """The value in payload; ValueError if it is malformed."""
+        if self.kind == "text":
+            return payload.decode("utf-8")  # UnicodeDecodeError is a ValueError
+        if len(payload) != self.struct.size:
+            raise ValueError(f"expected {self.struct.size} bytes, got {len(payload)}")
+        if self.kind == "int":
+            return self.struct.unpack(payload)[0]
+        whole, decimal = self.struct.unpack(payload)
+        value = (abs(whole) * self.scale + abs(decimal)) / self.scale  # Exact ints, so this is the nearest float
+        return -value if whole < 0 or (whole == 0 and decimal < 0) else value
+
+    def frame_dtype(self):
+        import numpy as np
+
+        payload = (">i2" if self.signed else ">u2") if self.kind == "int" else ("i1" if self.signed else "u1", 2)
+        return np.dtype([("header", "u1", 4), ("payload", payload), ("checksum", "u1"), ("trailer", "u1")])
+
+    def encode_frames(self, values):
+        """Frames for every value of a NumPy array (or sequence), returned back to back as bytes."""
+        import numpy as np
+
+        if self.kind == "text":
+            return b"".join(encode_packet(self.type_code, self.encode(value)) for value in values)
+        values = np.asarray(values, dtype=np.float64)
+        if self.kind == "fixed":  # Same bytes as encode() gives each number
+            magnitude = np.rint(np.abs(values) * self.scale)
+            whole = np.floor(magnitude / self.scale)
+            if ((values < 0) & (whole == 0) & (magnitude > 0)).any():
+                raise self.error()  # Between -1 and 0: the sign would be lost, see split()
+            payload = np.column_stack([np.where(values < 0, -whole, whole), magnitude - whole * self.scale])
+            info = np.iinfo(np.int8 if self.signed else np.uint8)
+        else:
+            payload = np.rint(values)
+            info = np.iinfo(np.int16 if self.signed else np.uint16)
+        if not np.isfinite(payload).all() or (payload < info.min).any() or (payload > info.max).any():
+            raise self.error()
+
+        frame_dtype = self.frame_dtype()
+        frames = np.empty(len(payload), dtype=frame_dtype)
+        frames["header"] = (0xAA, 0xBB, self.type_code, self.struct.size)
+        frames["payload"] = payload
+        frames["trailer"] = 0xCC
+        raw = frames.view(np.uint8).reshape(len(frames), frame_dtype.itemsize)
+        frames["checksum"] = np.bitwise_xor.reduce(raw[:, :-2], axis=1)
+        return frames.tobytes()
+
+    def decode_frames(self, blob):
+        """NumPy array of the values in back-to-back frames of this type; ValueError on any bad frame."""
+        import numpy as np
+
+        if self.kind == "text":
+            frames = list(read_frames(io.BytesIO(blob)))
+            if any(type_code != self.type_code for type_code, _ in frames):
+                raise ValueError(f"frames of another type than {self.type_code}")
+            return np.array([self.decode(payload) for _, payload in frames])
+        frame_dtype = self.frame_dtype()
+        if len(blob) % frame_dtype.itemsize:
+            raise ValueError(f"{len(blob)} bytes is not a whole number of {frame_dtype.itemsize}-byte frames")
+        frames = np.frombuffer(blob, dtype=frame_dtype)
+        raw = frames.view(np.uint8).reshape(len(frames), frame_dtype.itemsize)
+        bad = (
+            (frames["header"] != (0xAA, 0xBB, self.type_code, self.struct.size)).any(axis=1)
+            | (frames["trailer"] != 0xCC)
+            | (frames["checksum"] != np.bitwise_xor.reduce(raw[:, :-2], axis=1))
+        )
+        if bad.any():
+            raise ValueError(f"{int(bad.sum())} invalid frame(s), first at frame {int(np.argmax(bad))}")
+        if self.kind == "int":
+            return frames["payload"].astype(np.int64)
+        whole, decimal = frames["payload"].astype(np.int64).T
+        values = (np.abs(whole) * self.scale + np.abs(decimal)) / self.scale
+        return np.where((whole < 0) | ((whole == 0) & (decimal < 0)), -values, values)
+
+CODECS = {type_code: ValueCodec(type_code, *spec) for type_code, spec in DATA_SCHEMA.items()}
+
+def value_codec(type_code):
+    codec = CODECS.get(type_code)
+    if codec is None:
+        raise ValueError(f"Unsupported data type: {DATA_TYPES.get(type_code, type_code)} has no defined encoding and can't be sent.")
+    return codec
+
+def encode_command(type_code, value):
+    """Encode a command value typed as text with the rules for its data type."""
+    return value_codec(type_code).encode(value)
+
+def encode_values(type_code, values):
+    """Frames for a whole array of values of one data type, back to back."""
+    return value_codec(type_code).encode_frames(values)
+
+def decode_values(type_code, blob):
+    """Values of back-to-back frames of one data type, as a NumPy array."""
+    return value_codec(type_code).decode_frames(blob)
+
+def parse_command(line):
+    """Split a 'type=value' command; type is a DATA_TYPES index or name (e.g. '6=1200', 'rpm=1200')."""
+    name, separator, value = line.partition("=")
+    name = name.strip()
+    if not separator:
+        raise ValueError("Expected type=value.")
+    type_code = int(name) if name.isdigit() else DATA_TYPE_CODES.get(name.lower())
+    if type_code not in DATA_TYPES:
+        raise ValueError(f"Unknown data type '{name}'.")
+    return type_code, value.strip()
+
+def send_commands(client, commands):
+    """Encode 'type=value' commands and pipeline them over one connection without pausing.
+
+    commands is any iterable of lines (a list, an open file, sys.stdin); blank lines and
+    lines starting with '#' are skipped. Returns (sent, errors).
+    """
+    batcher = FrameBatcher(client)
+    sent = errors = 0
+    started = time.perf_counter()
+    try:
+        for number, line in enumerate(commands, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                type_code, value = parse_command(line)
+                batcher.sendall(encode_packet(type_code, encode_command(type_code, value)))
+            except ValueError as e:
+                print(f"❌ Command {number} '{line}': {e}")
+                errors += 1
+                continue
+            sent += 1
+    finally:
+        batcher.close()
+    elapsed = time.perf_counter() - started
+    rate = f" ({sent / elapsed:.0f}/s)" if elapsed > 0 else ""
+    print(f"📤 Sent {sent} commands in {elapsed:.3f} s{rate}")
+    return sent, errors
+
 def send_data(client):
+    batcher = FrameBatcher(client)
     try:
         while True:
             print("\nChoose data type to send:")
@@ -125,31 +878,20 @@ def send_data(client):
             
             value = input(f"Enter value for {DATA_TYPES[choice]}: ")
 
-            if choice == 3:  # GPS should be sent as a string
-                encoded_value = value.encode()  
-            elif choice in [4, 5, 10, 11]:  # Values that need to be split at decimal
-                try:
-                    # Split the input into whole number and decimal part
-                    whole_part, decimal_part = value.split('.')
-                    # Convert both parts to integers and then to hex
-                    whole_part_hex = int(whole_part).to_bytes(1, 'big', signed=True)
-                    decimal_part_hex = int(decimal_part).to_bytes(1, 'big', signed=True)
-                    encoded_value = whole_part_hex + decimal_part_hex
-                except ValueError:
-                    print("❌ Invalid decimal input. Please enter a valid number in the format 'whole.decimal'.")
-                    continue
-            elif choice in [6, 7, 8, 9, 12]:  # Values that should be sent as integers (without decimal values)
-                encoded_value = int(value).to_bytes(2, 'big', signed=True) # (working)
-            else:
-                print("❌ Unsupported data type.")
+            try:
+                encoded_value = encode_command(choice, value)
+            except ValueError as e:
+                print(f"❌ {e}")
                 continue
 
             packet = encode_packet(choice, encoded_value)
-            client.sendall(packet)
+            batcher.sendall(packet)
             print(f"📤 Sent: {packet.hex()}")
             time.sleep(1)
     except KeyboardInterrupt:
         print("\n⏹ Stopped sending.")
+    finally:
+        batcher.close()
 
 def listen_for_stop():
     global stop_sending
@@ -159,160 +901,137 @@ def listen_for_stop():
             stop_sending = True
             break  # Stop the thread
 
-def init_plot():
-    """Initialize the plotting window with six subplots including RPM and Phase Currents"""
-    plt.ion()  # Enable interactive mode
-    
-    # Create a 3x2 grid (6 subplots)
-    fig, axs = plt.subplots(3, 2, figsize=(14, 10))
-    fig.suptitle('Real-time Bus Data')
-    
-    # Get individual axes
-    ax1 = axs[0, 0]  # Bus Voltage
-    ax2 = axs[0, 1]  # Bus Current
-    ax3 = axs[1, 0]  # SOC
-    ax4 = axs[1, 1]  # Throttle
-    ax5 = axs[2, 0]  # RPM
-    ax6 = axs[2, 1]  # Phase Currents (U, V, W)
-    
-    # Set up voltage subplot
-    ax1.set_ylabel('Bus Voltage (V)')
-    ax1.set_ylim(80, 100)
-    ax1.grid(True)
-    
-    # Set up current subplot
-    ax2.set_ylabel('Bus Current (A)')
-    ax2.set_ylim(-30, 130)
-    ax2.grid(True)
-
-    # Set up SOC subplot
-    ax3.set_ylabel('SOC (%)')
-    ax3.set_ylim(0, 100)
-    ax3.grid(True)
-
-    # Set up throttle subplot
-    ax4.set_ylabel('Throttle (V)')
-    ax4.set_ylim(0, 6)
-    ax4.grid(True)
-    
-    # Set up RPM subplot
-    ax5.set_ylabel('RPM')
-    ax5.set_ylim(0, 4000)
-    ax5.grid(True)
-    
-    # Set up Phase Currents subplot
-    ax6.set_ylabel('Phase Currents (A)')
-    ax6.set_ylim(-50, 150)  # Adjust based on your current range
-    ax6.grid(True)
-    
-    return fig, axs
+class Dashboard:
+    """Live plots of the replayed data, redrawn by blitting persistent Polygon bands.
 
-def update_plot(fig, axs):
-    """Update the plot with new data including RPM and Phase Currents"""
-    with plot_lock:
-        # Only attempt to plot if we have data
-        if not timestamps or len(timestamps) == 0:
-            return
-        
-        # Get individual axes
-        ax1 = axs[0, 0]  # Bus Voltage
-        ax2 = axs[0, 1]  # Bus Current
-        ax3 = axs[1, 0]  # SOC
-        ax4 = axs[1, 1]  # Throttle
-        ax5 = axs[2, 0]  # RPM
-        ax6 = axs[2, 1]  # Phase Currents
-        
-        # Clear previous lines
-        ax1.clear()
-        ax2.clear()
-        ax3.clear()
-        ax4.clear()
-        ax5.clear()
-        ax6.clear()
-        
-        # Reset titles and grid
-        ax1.set_ylabel('Bus Voltage (V)')
-        ax2.set_ylabel('Bus Current (A)')
-        ax3.set_ylabel('SOC (%)')
-        ax4.set_ylabel('Throttle (V)')
-        ax5.set_ylabel('RPM')
-        ax6.set_ylabel('Phase Currents (A)')
-
-        ax1.grid(True)
-        ax2.grid(True)
-        ax3.grid(True)
-        ax4.grid(True)
-        ax5.grid(True)
-        ax6.grid(True)
-        
-        # Set y-axis limits
-        ax1.set_ylim(80, 100)
-        ax2.set_ylim(-30, 130)
-        ax3.set_ylim(0, 100)
-        ax4.set_ylim(0, 6)
-        ax5.set_ylim(0, 4000)
-        ax6.set_ylim(-50, 150)  # Adjust based on your current range
-
-        # Convert timestamps to numeric format for plotting
-        time_numbers = list(range(len(timestamps)))
-        
-        # Ensure all data lists have the same length as timestamps
-        valid_len = len(time_numbers)
-        
-        if len(voltage_data) == valid_len:
-            ax1.plot(time_numbers, list(voltage_data), 'b-', label='Voltage')
-            ax1.legend(loc='upper right')
-            
-        if len(current_data) == valid_len:
-            ax2.plot(time_numbers, list(current_data), 'r-', label='Current')
-            ax2.legend(loc='upper right')
-            
-        if len(soc_data) == valid_len:
-            ax3.plot(time_numbers, list(soc_data), 'g-', label='SOC')
-            ax3.legend(loc='upper right')
-            
-        if len(throttle_data) == valid_len:
-            ax4.plot(time_numbers, list(throttle_data), 'y-', label='Throttle')
-            ax4.legend(loc='upper right')
-            
-        if len(rpm_data) == valid_len:
-            ax5.plot(time_numbers, list(rpm_data), 'm-', label='RPM')
-            ax5.legend(loc='upper right')
-            
-        # Plot all phase currents on the same subplot
-        if len(current_u_data) == valid_len and len(current_v_data) == valid_len and len(current_w_data) == valid_len:
-            ax6.plot(time_numbers, list(current_u_data), 'r-', label='Current U')
-            ax6.plot(time_numbers, list(current_v_data), 'g-', label='Current V')
-            ax6.plot(time_numbers, list(current_w_data), 'b-', label='Current W')
-            ax6.legend(loc='upper right')
-        
-        # Set x-axis labels
-        if len(timestamps) > 0:
-            # Show fewer x-axis labels to prevent overcrowding
-            n_labels = min(5, len(timestamps))
-            if n_labels > 0:
-                step = max(len(timestamps) // n_labels, 1)
-                positions = list(range(0, len(timestamps), step))
-                labels = [timestamps[i].split()[1] for i in positions if i < len(timestamps)]  # Only show time part
-
-                # Set time labels only on bottom subplots
-                ax1.set_xticks([])
-                ax2.set_xticks([])
-                ax3.set_xticks([])
-                ax4.set_xticks([])
-                if positions and labels:
-                    ax5.set_xticks(positions)
-                    ax5.set_xticklabels(labels, rotation=45)
-                    ax6.set_xticks(positions)
-                    ax6.set_xticklabels(labels, rotation=45)
-        
-        # Adjust layout to prevent label cutoff
+    The figure, axes, labels and legends are drawn once; each frame only restores the
+    cached background, moves each series' band with set_xy() and blits. run() renders on
+    the calling (GUI) thread at PLOT_FPS from a HistoryStore (history.py), so the sender
+    only ever waits for the store's lock while appending a row. The store returns the
+    whole window min/max-decimated to about PLOT_POINTS buckets, drawn as a filled band
+    per series, so showing an hour costs the same as showing ten seconds; the scroll
+    wheel zooms between PLOT_MIN_WINDOW rows and everything kept. Tick labels change
+    with the data, so they are refreshed by a full redraw every PLOT_LABEL_INTERVAL
+    seconds.
+    """
+
+    # (axes row, axes column, y label, y limits, [(CSV column, colour, legend label), ...])
+    PANELS = [
+        (0, 0, 'Bus Voltage (V)', (80, 100), [('Bus_Voltage', 'b', 'Voltage')]),
+        (0, 1, 'Bus Current (A)', (-30, 130), [('Bus_Current', 'r', 'Current')]),
+        (1, 0, 'SOC (%)', (0, 100), [('SOC', 'g', 'SOC')]),
+        (1, 1, 'Throttle (V)', (0, 6), [('Throttle_Voltage', 'y', 'Throttle')]),
+        (2, 0, 'RPM', (0, 4000), [('RPM', 'm', 'RPM')]),
+        (2, 1, 'Phase Currents (A)', (-50, 150), [
+            ('Current_U', 'r', 'Current U'),
+            ('Current_V', 'g', 'Current V'),
+            ('Current_W', 'b', 'Current W'),
+        ]),
+    ]
+    TICKS = [0, 0.25, 0.5, 0.75, 1]  # Time labels at these fractions of the window
+
+    def __init__(self, history):
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Polygon
+
+        self.history = history
+        self.window = history.capacity  # Rows shown, changed with the scroll wheel
+        plt.ion()  # Enable interactive mode
+        self.fig, self.axs = plt.subplots(3, 2, figsize=(14, 10))
+        self.fig.suptitle('Real-time Bus Data')
+        self.lines = []  # (Polygon, history column)
+        for row, col, ylabel, ylim, series in self.PANELS:
+            ax = self.axs[row, col]
+            ax.set_ylabel(ylabel)
+            ax.set_ylim(*ylim)
+            ax.set_xlim(0, 1)
+            ax.grid(True)
+            for column, color, label in series:
+                band = Polygon([[0, 0]], closed=True, animated=True, facecolor=color, edgecolor=color,
+                               linewidth=1, label=label)
+                ax.add_patch(band)
+                self.lines.append((band, history.column(column)))
+            ax.legend(loc='upper right')
+            if row < 2:
+                ax.set_xticks([])  # Time labels only on the bottom subplots
         plt.tight_layout()
         plt.subplots_adjust(top=0.95)  # Make room for suptitle
-        
-        # Draw the update
-        fig.canvas.draw()
-        fig.canvas.flush_events()
+
+        self.background = None
+        self.last_full_draw = 0.0
+        self.frame_time = 0.0  # Seconds spent rendering the last frame
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self.fig.canvas.mpl_connect('scroll_event', self._on_scroll)
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def _on_draw(self, event):
+        # Any full draw (including resizes) invalidates the cached background
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for line, _ in self.lines:
+            line.axes.draw_artist(line)
+
+    def _on_scroll(self, event):
+        # Scrolling up zooms in on the newest data, down zooms out towards all of it
+        if event.button == 'up':
+            self.window = max(self.window // 2, PLOT_MIN_WINDOW)
+        else:
+            self.window = min(self.window * 2, self.history.capacity)
+        self.last_full_draw = 0.0  # Relabel on the next frame
+
+    def render(self):
+        """Draw one frame of the newest self.window rows."""
+        started = time.perf_counter()
+        import numpy as np
+
+        x, lows, highs = self.history.view(PLOT_POINTS, self.window)
+        if not len(x):
+            return
+
+        # Outline along the highs and back along the lows; with raw rows both are the line itself
+        outline_x = np.concatenate([x, x[::-1]])
+        for band, column in self.lines:
+            band.set_xy(np.column_stack([outline_x, np.concatenate([highs[:, column], lows[::-1, column]])]))
+
+        canvas = self.fig.canvas
+        if self.background is None or started - self.last_full_draw >= PLOT_LABEL_INTERVAL:
+            self._set_time_labels()
+            self.last_full_draw = started
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            for line, _ in self.lines:
+                line.axes.draw_artist(line)
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+        self.frame_time = time.perf_counter() - started
+        METRICS.observe("plot_frame_seconds", self.frame_time)
+
+    def _set_time_labels(self):
+        times = self.history.times_at(self.TICKS, self.window)
+        names = [format_time_ms(epoch_ms).split()[1] for epoch_ms in times]  # Only show time part
+        for ax in (self.axs[2, 0], self.axs[2, 1]):
+            ax.set_xticks(self.TICKS[:len(names)])
+            ax.set_xticklabels(names, rotation=45)
+
+    def run(self, sender_thread):
+        """Render at PLOT_FPS until sender_thread finishes or the window is closed."""
+        import matplotlib.pyplot as plt
+
+        interval = 1 / PLOT_FPS
+        while sender_thread.is_alive():
+            if not plt.fignum_exists(self.fig.number):
+                sender_thread.join()
+                break
+            self.render()
+            # Keep the window responsive for the rest of the frame
+            self.fig.canvas.start_event_loop(max(interval - self.frame_time, 0.001))
+
+    def close(self):
+        import matplotlib.pyplot as plt
+
+        plt.ioff()
+        plt.close(self.fig)
 
 def listen_for_stop():
     global stop_sending
@@ -322,130 +1041,185 @@ def listen_for_stop():
             stop_sending = True
             break  # Stop the thread
 
-def send_file_data(client):
-    global stop_sending, timestamps, voltage_data, current_data, soc_data, throttle_data, rpm_data
-    global current_u_data, current_v_data, current_w_data
+def iter_replay_chunks(path, start=0.0, chunk_rows=CHUNK_ROWS):
+    """Yield (times, epoch_ms, values, progress) from a replay CSV or a columnar capture.
+
+    start skips the first start seconds of the recording. A columnar capture (see
+    columnar.py) is memory-mapped and seeks straight to that row; a CSV has to be
+    parsed up to it.
+    """
+    import numpy as np
+
+    if os.path.isdir(path):
+        from columnar import ColumnarCapture
+
+        with ColumnarCapture(path) as capture:
+            for epoch_ms, values, progress in capture.chunks(capture.seek(start), chunk_rows):
+                yield format_times_ms(epoch_ms), epoch_ms, values, progress
+        return
+
+    start_ms = None  # Rows before this time are skipped, None once the start has been found
+    for chunk, offset, total_bytes in iter_csv_chunks(path, chunk_rows):
+        times, epoch_ms, values = parse_rows(chunk)
+        if start and len(epoch_ms):
+            start_ms = epoch_ms[0] + round(start * 1000) if start_ms is None else start_ms
+            later = np.flatnonzero(epoch_ms >= start_ms)
+            if not len(later):
+                continue
+            first = int(later[0])
+            times, epoch_ms, values = times[first:], epoch_ms[first:], values[first:]
+            start = 0.0
+        yield times, epoch_ms, values, offset / total_bytes
+
+def replay_file(batcher, scheduler, wire_format, path=None, start=0.0, history=None, analytics=None):
+    """Send every row of path (CSV_FILE by default) through batcher, paced by scheduler.
+
+    Sent rows are also added to history, if given, for the dashboard, and fed to
+    analytics (an AnalyticsFeed), if given.
+    """
+    path = path or CSV_FILE
+    row_count = 0
+
+    # Parse and encode the file a chunk at a time so sending starts right away
+    # and memory stays bounded no matter how large the capture is
+    for times, epoch_ms, values, progress in iter_replay_chunks(path, start):
+        if stop_sending:
+            break
+        packets = encode_rows(times, epoch_ms, values, wire_format)
+        for row_ms, row, packet in zip(epoch_ms.tolist(), values.tolist(), packets):
+            if stop_sending:
+                break
+
+            # Update plotting data, the dashboard picks it up on its own schedule
+            if history is not None:
+                history.append_row(row_ms, row)
+
+            scheduler.wait(row_ms)  # Send at the rate the data was recorded, scaled by speed
+            if packet:
+                batcher.sendall(packet)
+            if analytics is not None:
+                analytics.feed(row_ms, row)
+        
+            row_count += 1
+
+            if not LOG_ROWS:
+                continue
+            if wire_format == "json":
+                shown = packet.decode()
+            else:
+                shown = packet.hex() or "(goes out with its delta block)"
+            print(f"📤 Sent row {row_count}: {shown}")
+            print(f"⏱ Progress: {row_count} rows sent ({progress:.1%} of {os.path.basename(path)}) at {scheduler.report()}", end='\r')
+
+def send_file_data(client, wire_format=WIRE_FORMAT, speed=REPLAY_SPEED, headless=None, path=None, start=0.0):
+    global stop_sending
     stop_sending = False
+    path = path or CSV_FILE
     
-    print("\nSending data from file... (Press 'q' to stop)")
+    pace = f"{speed:g}x" if speed > 0 else "full speed"
+    offset = f" from {start:g} s" if start else ""
+    print(f"\nSending data from {path}{offset} as {wire_format} at {pace}... (Press 'q' to stop)")
 
     # Start a separate thread to listen for 'q' input
     listener_thread = threading.Thread(target=listen_for_stop, daemon=True)
     listener_thread.start()
-    
-    try:
-        df = pd.read_csv(CSV_FILE)
-        required_columns = ["Time", "Bus_Voltage", "Bus_Current", "RPM", "Torque", "Current_U", "Current_V", "Current_W", "Throttle_Voltage", "SOC"]
-        
-        # Check if all required columns are present
-        for column in required_columns:
-            if column not in df.columns:
-                raise ValueError(f"Missing required column: {column}")
-
-        row_count = 0
-
-        # Clear old data if starting fresh
-        with plot_lock:
-            timestamps.clear()
-            voltage_data.clear()
-            current_data.clear()
-            soc_data.clear()
-            throttle_data.clear()
-            rpm_data.clear()
-            current_u_data.clear()
-            current_v_data.clear()
-            current_w_data.clear()
-
-        # Get the figure and axes array
-        fig, axs = init_plot()
-
-        for _, row in df.iterrows():
-            if stop_sending:
-                break
+    scheduler = ReplayScheduler(speed)
+    batcher = FrameBatcher(client)
 
-            payload = {
-                "time" : row["Time"],
-                "motor_data" : {
-                    "busVoltage" : float(row["Bus_Voltage"]),
-                    "busCurrent" : float(row["Bus_Current"]),
-                    "rpm" : float(row["RPM"]),
-                    "torque" : float(row["Torque"]),
-                },
-                "phase_currents": {
-                    "u": float(row["Current_U"]),
-                    "v": float(row["Current_V"]),
-                    "w": float(row["Current_W"])
-                },
-                "system_status": {
-                    "throttle_voltage": float(row["Throttle_Voltage"]),
-                    "soc": float(row["SOC"])
-                }
-            }
-
-            # Update plotting data
-            with plot_lock:
-                timestamps.append(row["Time"])
-                voltage_data.append(float(row["Bus_Voltage"]))
-                current_data.append(float(row["Bus_Current"]))
-                soc_data.append(float(row["SOC"]))
-                throttle_data.append(float(row["Throttle_Voltage"]))
-                rpm_data.append(float(row["RPM"]))
-                current_u_data.append(float(row["Current_U"]))
-                current_v_data.append(float(row["Current_V"]))
-                current_w_data.append(float(row["Current_W"]))
-            
-            # Update plot every 5 data points to improve performance
-            if row_count % 5 == 0:
-                update_plot(fig, axs)
+    from analytics import AnalyticsFeed, StreamAnalytics
 
-            json_data = json.dumps(payload) # Convert to JSON string
-            client.sendall(json_data.encode()) # Send as bytes to server
-            
-            row_count += 1
+    analytics = AnalyticsFeed(StreamAnalytics(alarms=ALARMS) if ALARMS is not None else None)
+    headless = HEADLESS if headless is None else headless
+    history = None
+    if not headless:
+        from history import HistoryStore
 
-            print(f"📤 Sent row {row_count}: {json_data}")
-            print(f"⏱ Progress: {row_count}/{len(df)} rows sent", end='\r')
-            
-            time.sleep(0.1)  # Sending at 10Hz to match data generation rate
-
-    except FileNotFoundError:
-        print(f"❌ Error: CSV file not found at {CSV_FILE}")
-    except pd.errors.EmptyDataError:
-        print("❌ Error: The CSV file is empty")
-    except ValueError as ve:
-        print(f"❌ Error: {ve}")
-    except Exception as e:
-        print(f"❌ Error reading or sending data: {e}")
-    
+        history = HistoryStore(CSV_COLUMNS[1:], PLOT_HISTORY_ROWS)  # Fresh plots for every replay
+
+    def replay():
+        import pandas as pd
+
+        try:
+            replay_file(batcher, scheduler, wire_format, path, start, history, analytics)
+        except FileNotFoundError:
+            print(f"❌ Error: CSV file not found at {path}")
+        except pd.errors.EmptyDataError:
+            print("❌ Error: The CSV file is empty")
+        except ValueError as ve:
+            print(f"❌ Error: {ve}")
+        except Exception as e:
+            print(f"❌ Error reading or sending data: {e}")
+        finally:
+            try:
+                batcher.close()
+            except Exception as e:
+                print(f"❌ Error sending final batch: {e}")
+            analytics.close()
+
+    # Rows are sent from a worker thread while this thread renders the dashboard
+    # (GUI toolkits need the main thread), so a slow redraw never delays a send
+    sender_thread = threading.Thread(target=replay, daemon=True)
+    dashboard = None if headless else Dashboard(history)
+    status = None if LOG_ROWS else StatusLine(extra=lambda: f"{scheduler.rows} rows, {scheduler.report()} | {analytics.summary()}").start()
+    sender_thread.start()
+    try:
+        if dashboard:
+            dashboard.run(sender_thread)
+        else:
+            sender_thread.join()
+    except KeyboardInterrupt:
+        stop_sending = True
+        sender_thread.join()
     finally:
-        plt.ioff()
-        plt.close('all')
+        if status:
+            status.stop()
+        if dashboard:
+            dashboard.close()
     
+    if scheduler.rows > 1:
+        print(f"\n📈 Replayed {scheduler.rows} rows at {scheduler.report()}")
+        print(f"📈 {analytics.summary()}")
     print("\n⏹ Stopped sending file data. Returning to menu.\n")
 
 def receive_data(client):
     global stop_listening
     stop_listening = False
     print("\nListening for incoming data... (Press 'q' to stop)\n")
+    from analytics import AnalyticsFeed, StreamAnalytics
+
+    from delta import DeltaDecoder
+
+    analytics = AnalyticsFeed(StreamAnalytics(alarms=ALARMS) if ALARMS is not None else None)
+    deltas = DeltaDecoder()
 
-    def listen():
+    def show(type_code, payload):
+        if type_code == TELEMETRY_TYPE and len(payload) == TELEMETRY_RECORD.size:
+            epoch_ms, *values = TELEMETRY_RECORD.unpack(payload)
+            analytics.feed(epoch_ms, values)
+        elif type_code == DELTA_TYPE:
+            block = deltas.feed(payload)
+            if block is None:
+                return
+            for epoch_ms, values in zip(block[0].tolist(), block[1].tolist()):
+                analytics.feed(epoch_ms, values)
+                if LOG_ROWS:
+                    print(f"📥 Received: {telemetry_payload(format_time_ms(epoch_ms), values)}")
+            return
+        if LOG_ROWS:
+            print(f"📥 Received: {decode_payload(type_code, payload)}")
+
+    def watch_disconnect():
         global stop_listening
         while not stop_listening:
-            ready, _, _ = select.select([client], [], [], 1)  # Check if data is available
-            if ready:
-                data = client.recv(1024)
-                if not data:
-                    print("❌ Disconnected.")
-                    stop_listening = True
-                    break
-                decoded = decode_packet(data)
-                if decoded:
-                    print(f"📥 Received: {decoded}")
-            time.sleep(0.1)  # Small delay to reduce CPU usage
+            if client.closed.wait(1):
+                print("❌ Disconnected.")
+                stop_listening = True
 
-    # Start listening thread
-    listener_thread = threading.Thread(target=listen, daemon=True)
-    listener_thread.start()
+    # Frames are decoded on the connection's event loop as they arrive
+    client.set_frame_handler(show)
+    watcher_thread = threading.Thread(target=watch_disconnect, daemon=True)
+    watcher_thread.start()
+    status = None if LOG_ROWS else StatusLine(extra=analytics.summary).start()
 
     # Wait for 'q' to stop listening
     while not stop_listening:
@@ -453,16 +1227,279 @@ def receive_data(client):
         if user_input.lower() == 'q':
             stop_listening = True
 
+    client.set_frame_handler(None)
+    if status:
+        status.stop()
+    analytics.close()
+    if analytics.analytics.rows:
+        print(f"\n📈 {analytics.summary()}")
+    stats = client.protocol.decoder.stats()
+    if stats["resyncs"] or stats["checksum_errors"] or stats["trailer_errors"]:
+        print(f"⚠️ Stream errors: {stats}")
+    if deltas.dropped_blocks:
+        print(f"⚠️ Delta blocks dropped: {deltas.stats()}")
     print("\n⏹ Stopped receiving. Returning to menu.\n")
 
-def main():
+def synthesize_rows(count, rate=10.0):
+    """Generate (epoch_ms, values) sine-wave telemetry shaped like sensor-data-generator.py output."""
+    import numpy as np
+
+    t = np.arange(count) / rate
+
+    def wave(min_val, max_val, frequency, phase=0.0):
+        return (max_val + min_val) / 2 + (max_val - min_val) / 2 * np.sin(2 * np.pi * frequency * t + phase)
+
+    values = np.column_stack([
+        wave(85, 95, 0.03),                   # Bus_Voltage
+        wave(-20, 120, 0.08),                 # Bus_Current
+        wave(0, 2500, 0.05),                  # RPM
+        wave(0, 190, 0.06),                   # Torque
+        wave(-20, 120, 0.08),                 # Current_U
+        wave(-20, 120, 0.08, 2 * np.pi / 3),  # Current_V
+        wave(-20, 120, 0.08, 4 * np.pi / 3),  # Current_W
+        wave(0, 5, 0.02),                     # Throttle_Voltage
+        wave(20, 100, 0.01),                  # SOC
+    ]).round(2)
+    epoch_ms = int(time.time() * 1000) + np.round(t * 1000).astype(np.int64)
+    return epoch_ms, values
+
+def load_replay_frames(wire_format, synthetic=False):
+    """Encode the packets every simulated controller replays, from CSV_FILE or generated data.
+
+    Rows without a packet of their own (all but the last of each delta block) are left out,
+    so every entry is one write.
+    """
+    if synthetic:
+        epoch_ms, values = synthesize_rows(SYNTHETIC_ROWS)
+        times = format_times_ms(epoch_ms) if wire_format == "json" else None
+        return [packet for packet in encode_rows(times, epoch_ms, values, wire_format) if packet]
+
+    frames = []
+    rows = 0
+    for times, epoch_ms, values, _ in iter_replay_chunks(CSV_FILE):
+        frames += [packet for packet in encode_rows(times, epoch_ms, values, wire_format) if packet]
+        rows += len(epoch_ms)
+        if rows >= LOAD_MAX_ROWS:
+            break
+    return frames
+
+class LoadStats:
+    """Counters shared by every simulated controller of a load run."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.received = 0
+        self.active = 0
+        self.connected = 0
+        self.failed = 0
+        # Fixed-size histograms: a long run at 1000 controllers would otherwise keep millions of samples
+        self.connect_latency = Histogram()  # Seconds per successful connect
+        self.send_latency = Histogram()     # Seconds per write() + drain()
+
+    def latency_summary(self, name, histogram):
+        summary = histogram.summary()
+        points = "/".join(f"{summary[key] * 1000:.2f}" for key in ("p50", "p90", "p99"))
+        return f"   {name} latency p50/p90/p99: {points} ms (max {summary['max'] * 1000:.2f} ms)"
+
+async def simulate_controller(index, devices, frames, rate, duration, stats, connect_slots):
+    """One simulated vehicle: connect, then replay frames from its own phase offset at rate Hz."""
+    loop = asyncio.get_running_loop()
+    async with connect_slots:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(SERVER_IP, SERVER_PORT)
+        except OSError as e:
+            stats.failed += 1
+            if stats.failed == 1:
+                print(f"❌ Controller {index} failed to connect: {e}")
+            return
+        stats.connect_latency.observe(time.perf_counter() - started)
+    stats.connected += 1
+    stats.active += 1
+
+    async def drain_inbound():
+        # Read whatever the server pushes back so its send buffer never fills up
+        while data := await reader.read(RECV_SIZE):
+            stats.received += len(data)
+
+    inbound = asyncio.create_task(drain_inbound())
+    position = index * len(frames) // devices  # Each vehicle is at a different point of the capture
+    interval = 1 / rate
+    next_send = loop.time() + interval * index / devices  # Spread the sends over the interval
+    end = loop.time() + duration
+    try:
+        while next_send < end:
+            await asyncio.sleep(next_send - loop.time())
+            frame = frames[position % len(frames)]
+            started = time.perf_counter()
+            writer.write(frame)
+            await writer.drain()
+            stats.send_latency.observe(time.perf_counter() - started)
+            stats.frames += 1
+            stats.bytes += len(frame)
+            position += 1
+            next_send += interval
+    except OSError as e:
+        print(f"❌ Controller {index} lost its connection: {e}")
+    finally:
+        stats.active -= 1
+        inbound.cancel()
+        writer.close()
+
+async def report_load(stats, interval=1.0):
+    previous_frames = previous_bytes = 0
+    while True:
+        await asyncio.sleep(interval)
+        frames, sent = stats.frames - previous_frames, stats.bytes - previous_bytes
+        previous_frames, previous_bytes = stats.frames, stats.bytes
+        print(f"⏱ {stats.active} active, {stats.failed} failed: {frames / interval:.0f} frames/s, {sent / interval / 1e3:.1f} kB/s", end='\r')
+
+async def run_load(devices, frames, rate=LOAD_RATE, duration=LOAD_DURATION):
+    """Run devices simulated controllers against SERVER_IP:SERVER_PORT and return their LoadStats."""
+    stats = LoadStats()
+    connect_slots = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    reporter = asyncio.create_task(report_load(stats))
+    try:
+        await asyncio.gather(*(
+            simulate_controller(index, devices, frames, rate, duration, stats, connect_slots)
+            for index in range(devices)
+        ))
+    finally:
+        reporter.cancel()
+    return stats
+
+def generate_load(devices, rate=LOAD_RATE, duration=LOAD_DURATION, wire_format=WIRE_FORMAT, synthetic=False):
+    frames = load_replay_frames(wire_format, synthetic)
+    if not frames:
+        print("❌ Nothing to replay.")
+        return None
+    source = "synthetic data" if synthetic else CSV_FILE
+    unit, send_rate = "frames", rate
+    if wire_format == "delta":
+        from delta import DELTA_BLOCK_ROWS
+
+        # One write per block: each controller still produces rate rows per second
+        unit, send_rate = f"blocks of {DELTA_BLOCK_ROWS} rows", rate / DELTA_BLOCK_ROWS
+    print(f"🚗 Simulating {devices} controllers at {rate:g} Hz for {duration:g} s against {SERVER_IP}:{SERVER_PORT} ({len(frames)} {wire_format} {unit} from {source})")
+    started = time.perf_counter()
+    stats = asyncio.run(run_load(devices, frames, send_rate, duration))
+    elapsed = time.perf_counter() - started
+    print(f"\n📊 {stats.connected} connected, {stats.failed} failed: {stats.frames} {unit}, {stats.bytes / 1e6:.2f} MB in {elapsed:.1f} s "
+          f"→ {stats.frames / elapsed:.1f} {unit.split()[0]}/s, {stats.bytes / elapsed / 1e3:.1f} kB/s ({stats.received} bytes received)")
+    print(stats.latency_summary("connect", stats.connect_latency))
+    print(stats.latency_summary("send", stats.send_latency))
+    return stats
+
+def check_startup(runs=5):
+    """Time a fresh `import cli` in a subprocess; return True if the median is within budget."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = "import time; t = time.perf_counter(); import cli; print((time.perf_counter() - t) * 1000)"
+    timings = sorted(
+        float(subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True).stdout)
+        for _ in range(runs)
+    )
+    median = timings[len(timings) // 2]
+    ok = median <= STARTUP_TARGET_MS
+    print(f"{'✅' if ok else '❌'} Import time {median:.1f} ms (target {STARTUP_TARGET_MS} ms, {runs} runs)")
+    return ok
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mazout CLI Tool")
+    parser.add_argument("--host", default=SERVER_IP, help=f"server address (default {SERVER_IP})")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"server port (default {SERVER_PORT})")
+    parser.add_argument("--headless", action="store_true", help="never open plot windows")
+    parser.add_argument("--record", metavar="FILE", help="append every received frame to this recording (read it back with recorder.py)")
+    parser.add_argument("--send", nargs="+", metavar="TYPE=VALUE", help="send these commands (e.g. rpm=1200 busVoltage=90.50) and exit; immobilize and rpmPreset have no defined encoding and can't be sent")
+    parser.add_argument("--commands", metavar="FILE", help="send the TYPE=VALUE commands in FILE, one per line ('-' for stdin), and exit")
+    parser.add_argument("--file", default=CSV_FILE, help=f"replay source for file replay and --load: a CSV or a columnar capture made with columnar.py (default {CSV_FILE})")
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_FORMAT, help=f"telemetry encoding for file replay and --load (default {WIRE_FORMAT})")
+    parser.add_argument("--compression", choices=("none", "zlib", "lz4"), default=COMPRESSION, help=f"block compression of the delta wire format (default {COMPRESSION}; lz4 needs the lz4 package)")
+    parser.add_argument("--load", type=int, metavar="N", help="simulate N concurrent controllers replaying telemetry and exit")
+    parser.add_argument("--rate", type=float, default=LOAD_RATE, help=f"frames per second per simulated controller (default {LOAD_RATE:g})")
+    parser.add_argument("--duration", type=float, default=LOAD_DURATION, help=f"seconds of --load traffic (default {LOAD_DURATION:g})")
+    parser.add_argument("--synthetic", action="store_true", help=f"replay generated sine-wave data instead of {CSV_FILE} in --load mode")
+    parser.add_argument("--alarm", action="append", metavar="RULE", help="alarm on replayed/received telemetry, e.g. 'Bus_Voltage<84' or 'power_kw.mean>8~0.5' (repeatable, replaces the defaults)")
+    parser.add_argument("--quiet", action="store_true", help="don't print every sent/received row, show a status line with rates and latencies instead")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", help="serve counters and histograms at http://127.0.0.1:PORT/metrics (Prometheus text) and /metrics.json")
+    parser.add_argument("--startup-check", action="store_true", help=f"check that importing the CLI takes under {STARTUP_TARGET_MS} ms and exit")
+    return parser.parse_args(argv)
+
+def run_commands(args):
+    """Non-interactive mode: connect, send --send and --commands, disconnect."""
+    sock = connect_to_server()
+    if sock is None:
+        return 1
+    client = AsyncConnection(sock, (SERVER_IP, SERVER_PORT), recorder=Recorder(args.record) if args.record else None)
+    errors = 0
+    try:
+        if args.send:
+            errors += send_commands(client, args.send)[1]
+        if args.commands == "-":
+            errors += send_commands(client, sys.stdin)[1]
+        elif args.commands:
+            with open(args.commands) as commands:
+                errors += send_commands(client, commands)[1]
+    finally:
+        client.close()
+    return errors
+
+def main(argv=None):
+    global ALARMS, COMPRESSION, CSV_FILE, HEADLESS, LOG_ROWS, SERVER_IP, SERVER_PORT, WIRE_FORMAT
+    args = parse_args(argv)
+    if args.startup_check:
+        sys.exit(0 if check_startup() else 1)
+    if args.headless:
+        HEADLESS = True
+    SERVER_IP, SERVER_PORT = args.host, args.port
+    WIRE_FORMAT = args.wire_format
+    CSV_FILE = args.file
+    LOG_ROWS = not args.quiet
+    if args.compression != COMPRESSION:
+        from delta import check_compression
+
+        try:
+            check_compression(args.compression)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        COMPRESSION = args.compression
+    if args.alarm:
+        from analytics import AlarmRule
+
+        try:
+            ALARMS = [AlarmRule(rule) for rule in args.alarm]
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    if args.metrics_port is not None:
+        try:
+            server = serve_metrics(args.metrics_port)
+        except OSError as e:
+            print(f"❌ Can't serve metrics on port {args.metrics_port}: {e}")
+            sys.exit(1)
+        print(f"📈 Metrics at http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+
+    if args.load:
+        if args.rate <= 0 or args.duration <= 0:
+            print("❌ --rate and --duration must be greater than 0")
+            sys.exit(1)
+        stats = generate_load(args.load, args.rate, args.duration, args.wire_format, args.synthetic)
+        sys.exit(0 if stats and not stats.failed else 1)
+
+    if args.send or args.commands:
+        sys.exit(1 if run_commands(args) else 0)
+
     while True:
         print("\n Welcome to Mazout CLI Tool")
         print("1. Connect")
         print("2. Quit")
         choice = input("\nEnter option: ")
         if choice == "1":
-            client = connect_to_server()
+            sock = connect_to_server()
+            if sock is None:
+                continue
+            client = AsyncConnection(sock, (SERVER_IP, SERVER_PORT), recorder=Recorder(args.record) if args.record else None)
             while True:
                 print("\n Menu:")
                 print("1. Send Data")
@@ -475,7 +1512,25 @@ def main():
                 elif sub_choice == "2":
                     receive_data(client)
                 elif sub_choice == "3":
-                    send_file_data(client)
+                    wire_format = input(f"Wire format {'/'.join(WIRE_FORMATS)} (default {WIRE_FORMAT}): ").strip().lower() or WIRE_FORMAT
+                    speed = input(f"Replay speed, 0 = as fast as possible (default {REPLAY_SPEED:g}): ").strip() or REPLAY_SPEED
+                    start = input("Start this many seconds into the file (default 0): ").strip() or 0
+                    try:
+                        speed = float(speed)
+                    except ValueError:
+                        speed = -1
+                    try:
+                        start = float(start)
+                    except ValueError:
+                        start = -1
+                    if wire_format not in WIRE_FORMATS:
+                        print("\n ❌ Invalid wire format")
+                    elif not 0 <= speed < float("inf"):
+                        print("\n ❌ Invalid replay speed")
+                    elif not 0 <= start < float("inf"):
+                        print("\n ❌ Invalid start offset")
+                    else:
+                        send_file_data(client, wire_format, speed, start=start)
                 elif sub_choice == "4":
                     client.close()
                     print("\n Disconnected!! 🔌 ")
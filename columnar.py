@@ -0,0 +1,159 @@
+"""Columnar replay captures: the CSV_COLUMNS of a telemetry CSV stored as raw typed arrays.
+
+A capture is a directory holding one file per column plus meta.json:
+
+    meta.json          format, version, row count, dtype of every column, first/last time
+    Time.bin           int64 epoch milliseconds (the naive CSV time, as in binary telemetry)
+    Bus_Voltage.bin    float64, one file per measurement column
+
+Columns are opened with np.memmap, so a replay starts without parsing anything and
+only the pages it actually sends are read from disk. Times are sorted on conversion
+when the CSV already is, which lets seek() find a time offset with a binary search.
+
+    python columnar.py sensor_data.csv sensor_data.mzc   # convert
+    python columnar.py sensor_data.mzc                   # summary
+    python cli.py --file sensor_data.mzc                 # replay it
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from common import CHUNK_ROWS, CSV_COLUMNS, format_time_ms, iter_csv_chunks, parse_rows
+
+FORMAT = "mazout-columnar"
+VERSION = 1
+META_FILE = "meta.json"
+TIME_DTYPE = "<i8"
+VALUE_DTYPE = "<f8"  # float64 keeps the CSV values exact, so JSON replays print the same numbers
+
+
+def is_capture(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def column_path(path, column):
+    return os.path.join(path, f"{column}.bin")
+
+
+def convert(csv_path, path, chunk_rows=CHUNK_ROWS):
+    """Convert a replay CSV into a capture directory, a chunk at a time; returns the row count.
+
+    meta.json is written last, so an interrupted conversion is never mistaken for a capture.
+    """
+    os.makedirs(path, exist_ok=True)
+    if is_capture(path):
+        os.remove(os.path.join(path, META_FILE))
+    files = {column: open(column_path(path, column), "wb") for column in CSV_COLUMNS}
+    rows, first_ms, last_ms, is_sorted = 0, None, None, True
+    try:
+        for chunk, _, _ in iter_csv_chunks(csv_path, chunk_rows):
+            _, epoch_ms, values = parse_rows(chunk)
+            if not len(epoch_ms):
+                continue
+            if last_ms is not None and epoch_ms[0] < last_ms or np.any(np.diff(epoch_ms) < 0):
+                is_sorted = False
+            first_ms = int(epoch_ms[0]) if first_ms is None else first_ms
+            last_ms = int(epoch_ms[-1])
+            files["Time"].write(epoch_ms.astype(TIME_DTYPE).tobytes())
+            for i, column in enumerate(CSV_COLUMNS[1:]):
+                files[column].write(values[:, i].astype(VALUE_DTYPE).tobytes())
+            rows += len(epoch_ms)
+    finally:
+        for column_file in files.values():
+            column_file.close()
+
+    meta = {
+        "format": FORMAT,
+        "version": VERSION,
+        "rows": rows,
+        "columns": {column: TIME_DTYPE if column == "Time" else VALUE_DTYPE for column in CSV_COLUMNS},
+        "first_ms": first_ms,
+        "last_ms": last_ms,
+        "sorted": is_sorted,
+        "source": os.path.basename(csv_path),
+    }
+    with open(os.path.join(path, META_FILE), "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    return rows
+
+
+class ColumnarCapture:
+    """Memory-mapped view of a capture directory."""
+
+    def __init__(self, path):
+        if not is_capture(path):
+            raise ValueError(f"{path} is not a columnar capture (no {META_FILE})")
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("format") != FORMAT or self.meta.get("version") != VERSION:
+            raise ValueError(f"{path}: unsupported capture format {self.meta.get('format')} v{self.meta.get('version')}")
+        self.path = path
+        self.rows = self.meta["rows"]
+        self.columns = {}
+        for column in CSV_COLUMNS:
+            dtype = np.dtype(self.meta["columns"][column])
+            size = os.path.getsize(column_path(path, column))
+            if size != self.rows * dtype.itemsize:
+                raise ValueError(f"{path}: {column} has {size} bytes, expected {self.rows} rows")
+            # np.memmap refuses empty files
+            self.columns[column] = (np.memmap(column_path(path, column), dtype=dtype, mode="r", shape=(self.rows,))
+                                    if self.rows else np.empty(0, dtype=dtype))
+        self.epoch_ms = self.columns["Time"]
+
+    def __len__(self):
+        return self.rows
+
+    def seek(self, offset):
+        """Index of the first row at least offset seconds after the first one."""
+        if not self.rows:
+            return 0
+        target = int(self.epoch_ms[0]) + round(offset * 1000)
+        if self.meta["sorted"]:
+            return int(np.searchsorted(self.epoch_ms, target, side="left"))
+        later = np.flatnonzero(self.epoch_ms >= target)
+        return int(later[0]) if len(later) else self.rows
+
+    def values(self, start=0, stop=None):
+        """Rows [start, stop) of the measurement columns as an (n, 9) float64 array."""
+        return np.column_stack([self.columns[column][start:stop] for column in CSV_COLUMNS[1:]])
+
+    def chunks(self, start=0, chunk_rows=CHUNK_ROWS):
+        """Yield (epoch_ms, values, progress) for rows start onwards, chunk_rows at a time."""
+        for first in range(start, self.rows, chunk_rows):
+            last = min(first + chunk_rows, self.rows)
+            yield np.array(self.epoch_ms[first:last]), self.values(first, last), last / self.rows
+
+    def close(self):
+        self.columns.clear()  # Dropping the memmaps unmaps the files
+        self.epoch_ms = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a replay CSV to a columnar capture, or summarise one")
+    parser.add_argument("source", help="CSV file to convert, or capture directory to summarise")
+    parser.add_argument("capture", nargs="?", help="capture directory to write (default: the CSV name with .mzc)")
+    args = parser.parse_args(argv)
+
+    if is_capture(args.source):
+        with ColumnarCapture(args.source) as capture:
+            meta = capture.meta
+            span = f", {format_time_ms(meta['first_ms'])} → {format_time_ms(meta['last_ms'])}" if capture.rows else ""
+            print(f"{args.source}: {capture.rows} rows from {meta['source']}{span}{'' if meta['sorted'] else ' (unsorted)'}")
+        return
+
+    path = args.capture or os.path.splitext(args.source)[0] + ".mzc"
+    rows = convert(args.source, path)
+    size = sum(os.path.getsize(column_path(path, column)) for column in CSV_COLUMNS)
+    print(f"✅ {rows} rows from {args.source} ({os.path.getsize(args.source) / 1e6:.1f} MB) → {path} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Wire and CSV basics shared by cli.py and the modules it loads on demand.
+
+analytics.py, delta.py and columnar.py are imported by cli.py, so they take these from
+here rather than from cli: importing the entry script back would load it a second time
+when it runs as __main__.
+"""
+import datetime
+import os
+import threading
+import time
+
+from metrics import METRICS
+
+CHUNK_ROWS = 10000  # Rows parsed and encoded at a time when replaying a file
+
+# Frame types of binary telemetry: one record per frame (see cli.TELEMETRY_RECORD)
+# and the delta stream (see delta.py)
+TELEMETRY_TYPE = 13
+DELTA_TYPE = 14
+CSV_COLUMNS = ["Time", "Bus_Voltage", "Bus_Current", "RPM", "Torque", "Current_U", "Current_V", "Current_W", "Throttle_Voltage", "SOC"]
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def encode_packet(index, payload):
+    if isinstance(payload, str):
+        payload_bytes = payload.encode()
+    elif isinstance(payload, int):
+        payload_bytes = payload.to_bytes(2, byteorder='big', signed=True)
+    elif isinstance(payload, bytes):  # Handle bytes directly
+        payload_bytes = payload
+    else:
+        raise ValueError("Payload must be int, str, or bytes")
+    
+    frame = bytes((0xAA, 0xBB, index, len(payload_bytes))) + payload_bytes
+    return frame + bytes((xor_checksum(frame), 0xCC))
+
+
+def xor_checksum(data):
+    """XOR of every byte in data, folded as one big integer instead of byte by byte."""
+    if len(data) < 56:  # Command-sized frames: the plain loop is faster below this
+        checksum = 0
+        for byte in data:
+            checksum ^= byte
+        return checksum
+    value = int.from_bytes(data, "big")
+    width = len(data)
+    while width > 1:
+        half = width // 2
+        value = (value >> (half * 8)) ^ (value & ((1 << (half * 8)) - 1))
+        width -= half
+    return value
+
+
+def parse_time_ms(time_str):
+    return (datetime.datetime.strptime(time_str, TIME_FORMAT) - EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def format_time_ms(epoch_ms):
+    return (EPOCH + datetime.timedelta(milliseconds=epoch_ms)).strftime(TIME_FORMAT)[:-3]
+
+
+def format_times_ms(epoch_ms):
+    """format_time_ms() for a whole array of epoch milliseconds, returned as a list."""
+    import numpy as np
+
+    iso = np.datetime_as_string(np.asarray(epoch_ms).astype("datetime64[ms]"), unit="ms")
+    iso.view("U1").reshape(len(iso), -1)[:, 10] = " "  # The 'T' between date and time
+    return iso.tolist()
+
+
+def parse_rows(df):
+    """Split a DataFrame (or a chunk of one) into time strings, epoch ms and an (n, 9) value array."""
+    import numpy as np
+    import pandas as pd
+
+    times = df["Time"].astype(str).tolist()
+    parsed = pd.to_datetime(df["Time"], format=TIME_FORMAT)
+    values = df[CSV_COLUMNS[1:]].to_numpy(dtype=np.float64)
+    # NaN and inf have no JSON encoding, so a row with a missing cell is an error, not a send
+    bad = np.flatnonzero(parsed.isna().to_numpy() | ~np.isfinite(values).all(axis=1))
+    if len(bad):
+        raise ValueError(f"Row {df.index[bad[0]] + 1} has a missing or non-finite value ({len(bad)} such rows in this chunk)")
+    epoch_ms = parsed.to_numpy(dtype="datetime64[ms]").view(np.int64)
+    return times, epoch_ms, values
+
+
+def iter_csv_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Yield (chunk, byte_offset, total_bytes) while streaming a replay CSV from disk.
+
+    byte_offset is how far the parser has read into the file, which tracks progress
+    without counting rows up front.
+    """
+    import pandas as pd
+
+    with open(path, "rb") as csv_file:
+        total_bytes = os.fstat(csv_file.fileno()).st_size
+        with pd.read_csv(csv_file, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                # Check if all required columns are present
+                for column in CSV_COLUMNS:
+                    if column not in chunk.columns:
+                        raise ValueError(f"Missing required column: {column}")
+                yield chunk, csv_file.tell(), total_bytes
+
+
+class TimedBatch:
+    """Base for collectors that hand over what they gathered in batches.
+
+    A batch is flushed when the subclass decides it is full, or max_delay seconds after
+    its first item arrived, whichever comes first. A background thread handles the time
+    limit, so an item is never held back longer than max_delay even when the producer
+    goes quiet. Subclasses call _arm() (with self.cond held) when adding an item and
+    implement _process() to hand over and reset the batch; _flush() runs it under the
+    lock, which also keeps batches in order.
+    """
+
+    def __init__(self, max_delay):
+        self.max_delay = max_delay
+        self.deadline = None
+        self.cond = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._flush_when_due, daemon=True)
+        self.thread.start()
+
+    def _arm(self):
+        if self.deadline is None:  # First item of a batch
+            self.deadline = time.monotonic() + self.max_delay
+            self.cond.notify()
+
+    def _flush(self):
+        self.deadline = None
+        self._process()
+
+    def _process(self):
+        raise NotImplementedError
+
+    def _stop_timer(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+
+    def _timer_failed(self, error):
+        """A timed flush raised; nobody is waiting on the timer thread, so report it here."""
+        METRICS.inc("batch_errors")
+        print(f"❌ {type(self).__name__} failed to process a batch: {error!r}")
+
+    def _flush_when_due(self):
+        with self.cond:
+            while not self.closed:
+                if self.deadline is None:
+                    self.cond.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.cond.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except Exception as e:
+                    self._timer_failed(e)
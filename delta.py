@@ -0,0 +1,230 @@
+"""Delta telemetry stream: blocks of rows as zig-zag varint deltas, optionally compressed.
+
+Every block of up to DELTA_BLOCK_ROWS rows is encoded on its own:
+
+    block    codec (u8: 0 none, 1 zlib, 2 lz4) + body, compressed as a whole unless 'none'
+    body     varint row count, then for each of the ten columns (epoch ms and the nine
+             CSV_COLUMNS values, quantized by FIELD_SCALES) the first row as a keyframe
+             and every following row as the difference to the row before, all as
+             zig-zag varints, column after column
+
+Column-major deltas of slowly changing 10 Hz signals are mostly one-byte varints, and
+runs of them compress well. Because each block starts from a keyframe, a block lost
+(e.g. dropped from the offline queue) never corrupts the ones after it.
+
+A block is split into DELTA_TYPE frames of at most 255 payload bytes, each starting with
+a fragment header: block sequence number (u16), fragment index (u8), fragment count (u8).
+DeltaDecoder reassembles the fragments and returns the rows.
+
+Quantization is lossy below the step of each field (0.01 for most, 1 rpm, 0.1 % SOC),
+which is the precision the controller logs with.
+"""
+import itertools
+import struct
+import zlib
+from collections import deque
+
+import numpy as np
+
+from common import CSV_COLUMNS, DELTA_TYPE, encode_packet
+
+DELTA_BLOCK_ROWS = 50  # Rows per block: 5 s of 10 Hz data, also the keyframe interval
+FIELD_SCALES = np.array([1, 100, 100, 1, 100, 100, 100, 100, 100, 10])  # Time (ms) then CSV_COLUMNS[1:]
+FRAGMENT_HEADER = struct.Struct(">HBB")
+MAX_FRAGMENT_DATA = 255 - FRAGMENT_HEADER.size
+COMPRESSIONS = {"none": 0, "zlib": 1, "lz4": 2}
+ZLIB_LEVEL = 6
+RECENT_ERRORS = 10  # Decode errors a DeltaDecoder keeps for diagnosis
+
+_sequence = itertools.count()
+
+
+def check_compression(name):
+    """Raise ValueError if the named block compression can't be used here."""
+    if name not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{name}' (one of {', '.join(COMPRESSIONS)})")
+    if name == "lz4":
+        try:
+            import lz4.frame  # noqa: F401
+        except ImportError:
+            raise ValueError("lz4 compression needs the lz4 package (pip install lz4)")
+
+
+def compress(body, name):
+    if name == "zlib":
+        return zlib.compress(body, ZLIB_LEVEL)
+    if name == "lz4":
+        import lz4.frame
+
+        return lz4.frame.compress(body)
+    return body
+
+
+def decompress(data, codec):
+    if codec == COMPRESSIONS["none"]:
+        return data
+    if codec == COMPRESSIONS["zlib"]:
+        return zlib.decompress(data)
+    if codec == COMPRESSIONS["lz4"]:
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ValueError("lz4 block, but the lz4 package is not installed (pip install lz4)")
+        return lz4.frame.decompress(data)
+    raise ValueError(f"unknown block codec {codec}")
+
+
+def encode_varints(values):
+    """Unsigned LEB128 varints of a uint64 array, as bytes."""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= np.uint64(1 << shift)
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+    for i in range(int(lengths.max()) if len(values) else 0):
+        more = lengths > i
+        groups = ((values[more] >> np.uint64(7 * i)) & np.uint64(0x7F)).astype(np.uint8)
+        out[starts[more] + i] = groups | np.where(lengths[more] > i + 1, 0x80, 0).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(data):
+    """uint64 array of the varints in data; raises ValueError if the last one is cut off."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.zeros(0, dtype=np.uint64)
+    if raw[-1] & 0x80:
+        raise ValueError("truncated varint")
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    if position.max() > 9:
+        raise ValueError("varint too long")
+    groups = (raw & 0x7F).astype(np.uint64) << (np.uint64(7) * position.astype(np.uint64))
+    return np.add.reduceat(groups, starts)
+
+
+def zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def unzigzag(values):
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def encode_block(epoch_ms, values, compression="zlib"):
+    """One block (codec byte + body) for up to a few thousand rows."""
+    quantized = np.column_stack([np.asarray(epoch_ms, dtype=np.int64), np.rint(np.asarray(values) * FIELD_SCALES[1:])])
+    quantized = quantized.astype(np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, quantized.shape[1]), dtype=np.int64))
+    body = encode_varints([len(quantized)]) + encode_varints(zigzag(deltas.T.ravel()))
+    packed = compress(body, compression)
+    if compression != "none" and len(packed) >= len(body):
+        compression, packed = "none", body  # Tiny blocks can grow when compressed
+    return bytes([COMPRESSIONS[compression]]) + packed
+
+
+def decode_block(block):
+    """(epoch_ms int64 array, (rows, 9) float array) of one block."""
+    numbers = decode_varints(decompress(block[1:], block[0]))
+    if not len(numbers):
+        raise ValueError("empty block")
+    rows = int(numbers[0])
+    columns = len(CSV_COLUMNS)
+    if len(numbers) != 1 + rows * columns:
+        raise ValueError(f"block holds {len(numbers) - 1} numbers, expected {rows * columns}")
+    quantized = np.cumsum(unzigzag(numbers[1:]).reshape(columns, rows), axis=1).T
+    return quantized[:, 0], quantized[:, 1:] / FIELD_SCALES[1:]
+
+
+def fragment(block, sequence):
+    """Split a block into DELTA_TYPE frames."""
+    pieces = [block[i:i + MAX_FRAGMENT_DATA] for i in range(0, len(block), MAX_FRAGMENT_DATA)]
+    if len(pieces) > 255:
+        raise ValueError(f"block of {len(block)} bytes needs more than 255 fragments")
+    return [encode_packet(DELTA_TYPE, FRAGMENT_HEADER.pack(sequence & 0xFFFF, index, len(pieces)) + piece)
+            for index, piece in enumerate(pieces)]
+
+
+def encode_stream_rows(epoch_ms, values, compression="zlib", block_rows=DELTA_BLOCK_ROWS):
+    """Per-row packets for a chunk of rows, the same shape encode_rows() returns for other formats.
+
+    A block's frames are attached to its last row and the other rows get b"", so a paced
+    replay sends each block as soon as the newest row in it is due.
+    """
+    packets = [b""] * len(epoch_ms)
+    for start in range(0, len(epoch_ms), block_rows):
+        stop = min(start + block_rows, len(epoch_ms))
+        block = encode_block(epoch_ms[start:stop], values[start:stop], compression)
+        packets[stop - 1] = b"".join(fragment(block, next(_sequence)))
+    return packets
+
+
+def describe_fragment(payload):
+    """What decode_payload() shows for a single DELTA_TYPE frame."""
+    if len(payload) < FRAGMENT_HEADER.size:
+        return {"error": f"{len(payload)}-byte fragment is shorter than its header"}
+    sequence, index, count = FRAGMENT_HEADER.unpack_from(payload)
+    return {"sequence": sequence, "fragment": index + 1, "of": count, "bytes": len(payload) - FRAGMENT_HEADER.size}
+
+
+class DeltaDecoder:
+    """Reassemble DELTA_TYPE fragments from one connection into rows."""
+
+    def __init__(self):
+        self.sequence = None
+        self.pieces = []
+        self.skipping = None  # Sequence of a block already counted as dropped, until it ends
+        self.last_sequence = None  # Newest block sequence seen in any fragment
+        self.blocks = 0
+        self.rows = 0
+        self.dropped_blocks = 0  # Incomplete, undecodable or entirely missing blocks
+        self.errors = deque(maxlen=RECENT_ERRORS)  # Newest decode errors, as text
+
+    def feed(self, payload):
+        """Add one frame payload; returns (epoch_ms, values) arrays once a block completes, else None."""
+        if len(payload) < FRAGMENT_HEADER.size:
+            self.dropped_blocks += 1
+            return None
+        sequence, index, count = FRAGMENT_HEADER.unpack_from(payload)
+        self._count_missing(sequence)
+        if index == 0:
+            self.skipping = None
+            if self.pieces:
+                self.dropped_blocks += 1  # The previous block never finished
+            self.sequence, self.pieces = sequence, []
+        elif sequence == self.skipping:
+            return None  # The rest of a block already counted as dropped
+        elif sequence != self.sequence or index != len(self.pieces):
+            self.dropped_blocks += 1  # Joined mid-block or lost a fragment
+            self.sequence, self.pieces, self.skipping = None, [], sequence
+            return None
+        self.pieces.append(payload[FRAGMENT_HEADER.size:])
+        if len(self.pieces) < count:
+            return None
+        block, self.pieces = b"".join(self.pieces), []
+        try:
+            epoch_ms, values = decode_block(block)
+        except Exception as e:  # zlib/lz4 errors, a missing lz4 package, bad varints: drop the block, keep the stream
+            self.dropped_blocks += 1
+            self.errors.append(str(e))
+            return None
+        self.blocks += 1
+        self.rows += len(epoch_ms)
+        return epoch_ms, values
+
+    def _count_missing(self, sequence):
+        """Count the blocks skipped between the last sequence seen and this one."""
+        if sequence == self.last_sequence:
+            return
+        if self.last_sequence is not None:
+            gap = (sequence - self.last_sequence - 1) & 0xFFFF
+            if gap < 0x8000:  # A jump back (e.g. a --load replay looping) is a restart, not a loss
+                self.dropped_blocks += gap
+        self.last_sequence = sequence
+
+    def stats(self):
+        return {"blocks": self.blocks, "rows": self.rows, "dropped_blocks": self.dropped_blocks}
@@ -0,0 +1,146 @@
+"""Multi-resolution plot history: NumPy ring buffers with a min/max pyramid on top.
+
+The raw rows live in a preallocated ring of `capacity` rows. Level k of the pyramid keeps
+the min and max of every block of fanout**k consecutive rows, in its own ring covering
+the same span, and is filled in as blocks complete, so appending stays O(1) amortized.
+view() answers "the whole window in about `points` buckets" from the coarsest level that
+still has at least `points` blocks in the window: the number of vertices drawn, and so
+the redraw cost, is bounded no matter whether the window holds a minute or hours of data.
+Min/max decimation keeps spikes visible, which averaging or plain subsampling would hide.
+The result is an envelope (lows and highs per bucket), best drawn as a filled band: a
+zig-zag line through the same points makes the renderer overdraw every pixel many times.
+"""
+import threading
+
+import numpy as np
+
+HISTORY_ROWS = 1 << 16  # Rows kept for the dashboard, ~1.8 hours of 10 Hz data
+FANOUT = 2  # Blocks of one pyramid level that make up a block of the next
+
+
+class HistoryStore:
+    """Ring buffer of (epoch ms, values row) with min/max levels; safe to share between threads."""
+
+    def __init__(self, columns, capacity=HISTORY_ROWS, fanout=FANOUT):
+        self.columns = list(columns)
+        self.fanout = fanout
+        # Round up to a power of fanout so every level's blocks line up with the ring
+        self.capacity = fanout
+        while self.capacity < capacity:
+            self.capacity *= fanout
+        width = len(self.columns)
+        self.times = np.zeros(self.capacity, dtype=np.int64)
+        self.values = np.zeros((self.capacity, width))
+        self.levels = []  # (block size, mins, maxs), finest first
+        size = fanout
+        while size < self.capacity:
+            blocks = self.capacity // size
+            self.levels.append((size, np.zeros((blocks, width)), np.zeros((blocks, width))))
+            size *= fanout
+        self.count = 0  # Rows ever appended; row i lives at i % capacity
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def column(self, name):
+        return self.columns.index(name)
+
+    def append(self, epoch_ms, values):
+        """Add one row (a time and a values sequence) or many (an array of times and an (n, columns) array)."""
+        epoch_ms = np.atleast_1d(np.asarray(epoch_ms, dtype=np.int64))
+        values = np.asarray(values, dtype=np.float64).reshape(len(epoch_ms), len(self.columns))
+        with self.lock:
+            if len(epoch_ms) > self.capacity:  # Only the newest capacity rows can be kept
+                self.count += len(epoch_ms) - self.capacity
+                epoch_ms, values = epoch_ms[-self.capacity:], values[-self.capacity:]
+            old = self.count
+            positions = np.arange(old, old + len(epoch_ms)) % self.capacity
+            self.times[positions] = epoch_ms
+            self.values[positions] = values
+            self.count += len(epoch_ms)
+
+            below_min = below_max = self.values
+            below_blocks = self.capacity
+            for size, mins, maxs in self.levels:
+                first, last = old // size, self.count // size  # Blocks completed by this append
+                if first == last:
+                    break  # Coarser levels can't have completed a block either
+                blocks = np.arange(max(first, last - mins.shape[0]), last)
+                children = (blocks[:, None] * self.fanout + np.arange(self.fanout)) % below_blocks
+                slots = blocks % mins.shape[0]
+                mins[slots] = below_min[children].min(axis=1)
+                maxs[slots] = below_max[children].max(axis=1)
+                below_min, below_max, below_blocks = mins, maxs, mins.shape[0]
+
+    def append_row(self, epoch_ms, row):
+        """append() for a single row without the array conversions, for per-row producers."""
+        with self.lock:
+            position = self.count % self.capacity
+            self.times[position] = epoch_ms
+            self.values[position] = row
+            self.count += 1
+            below_min = below_max = self.values
+            below_blocks = self.capacity
+            for size, mins, maxs in self.levels:
+                if self.count % size:
+                    break
+                block = self.count // size - 1
+                child = block * self.fanout % below_blocks  # Children are adjacent in the ring
+                slot = block % mins.shape[0]
+                mins[slot] = below_min[child:child + self.fanout].min(axis=0)
+                maxs[slot] = below_max[child:child + self.fanout].max(axis=0)
+                below_min, below_max, below_blocks = mins, maxs, mins.shape[0]
+
+    def view(self, points, window=None):
+        """Decimate the newest window rows (all kept rows by default) for plotting.
+
+        Returns (x, lows, highs): x runs from 0 (oldest) to 1 (newest) across the window,
+        lows and highs have one column per store column. When the window holds more than
+        `points` rows they are the min and max of between points and fanout * points
+        buckets; otherwise they are both the raw rows.
+        """
+        with self.lock:
+            end = self.count
+            window = min(window or self.capacity, len(self))
+            start = end - window
+            if window < 2:
+                rows = self.values[[start % self.capacity] * window]
+                return np.zeros(window), rows, rows
+            level = None
+            for candidate in self.levels:
+                if window // candidate[0] < points:
+                    break
+                level = candidate
+            if level is None:
+                x = np.arange(start, end)
+                rows = self.values[x % self.capacity]
+                return (x - start) / (window - 1), rows, rows
+
+            size, mins, maxs = level
+            first, last = -(-start // size), end // size  # Whole blocks inside the window
+            blocks = np.arange(first, last)
+            lows, highs = mins[blocks % mins.shape[0]], maxs[blocks % mins.shape[0]]
+            starts, stops = blocks * size, (blocks + 1) * size
+            if start < first * size:  # The oldest rows, before the first whole block, come from the raw rows
+                head = self.values[np.arange(start, first * size) % self.capacity]
+                lows = np.vstack([head.min(axis=0), lows])
+                highs = np.vstack([head.max(axis=0), highs])
+                starts, stops = np.insert(starts, 0, start), np.insert(stops, 0, first * size)
+            if end > last * size:  # The newest, still incomplete block likewise
+                tail = self.values[np.arange(last * size, end) % self.capacity]
+                lows = np.vstack([lows, tail.min(axis=0)])
+                highs = np.vstack([highs, tail.max(axis=0)])
+                starts, stops = np.append(starts, last * size), np.append(stops, end)
+        centres = ((starts + stops - 1) / 2 - start) / (window - 1)
+        return centres, lows, highs
+
+    def times_at(self, fractions, window=None):
+        """Epoch ms of the rows at the given 0..1 positions of the window used by view()."""
+        with self.lock:
+            window = min(window or self.capacity, len(self))
+            if not window:
+                return []
+            start = self.count - window
+            rows = [start + round(fraction * (window - 1)) for fraction in fractions]
+            return self.times[np.array(rows) % self.capacity].tolist()
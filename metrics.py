@@ -0,0 +1,228 @@
+"""Counters, gauges and histograms for the client, with a status line and an HTTP endpoint.
+
+Everything is recorded into one Metrics registry (METRICS) from whichever thread does the
+work: the replay thread, the connection's event loop and the dashboard. Updates are a
+dict increment under a lock, so instrumenting per-frame paths stays cheap.
+
+    METRICS.inc("frames_sent")
+    METRICS.observe("send_seconds", elapsed)
+    METRICS.gauge("queue_bytes", lambda: connection.queued_bytes)
+
+StatusLine prints a compact one-line summary every few seconds, and serve_metrics()
+exposes the registry at http://127.0.0.1:PORT/metrics (Prometheus text format) and
+/metrics.json while a session is running.
+"""
+import bisect
+import json
+import threading
+import time
+
+STATUS_INTERVAL = 1.0  # Seconds between status lines
+METRICS_HOST = "127.0.0.1"  # The endpoint is for local scraping only
+PREFIX = "mazout_"
+# Histogram bucket bounds in seconds: 25% apart from 1 µs to ~100 s, so any
+# percentile read back is within 25% of the true value
+BUCKETS = [1e-6 * 1.25 ** i for i in range(83)]
+
+
+class Histogram:
+    """Fixed log-spaced buckets plus count, sum, min and max; constant memory."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS[i] if i < len(BUCKETS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """Registry of named counters, gauges (callables read on demand) and histograms."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started = time.monotonic()
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name, read):
+        """Register read() as the current value of name; None removes it."""
+        with self.lock:
+            if read is None:
+                self.gauges.pop(name, None)
+            else:
+                self.gauges[name] = read
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            gauges = list(self.gauges.items())
+        values = {}
+        for name, read in gauges:
+            try:
+                values[name] = read()
+            except Exception:  # A gauge of a connection that is being torn down
+                continue
+        return {
+            "uptime_seconds": time.monotonic() - self.started,
+            "counters": counters,
+            "gauges": values,
+            "histograms": histograms,
+        }
+
+
+METRICS = Metrics()
+
+
+def prometheus_text(snapshot):
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = [f"{PREFIX}uptime_seconds {snapshot['uptime_seconds']:.3f}"]
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        lines.append(f"{PREFIX}{name}_total {value}")
+    for name, value in sorted(snapshot["gauges"].items()):
+        lines.append(f"# TYPE {PREFIX}{name} gauge")
+        lines.append(f"{PREFIX}{name} {value}")
+    for name, summary in sorted(snapshot["histograms"].items()):
+        lines.append(f"# TYPE {PREFIX}{name} summary")
+        for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+            lines.append(f'{PREFIX}{name}{{quantile="{quantile}"}} {summary[key]:.9f}')
+        lines.append(f"{PREFIX}{name}_sum {summary['sum']:.9f}")
+        lines.append(f"{PREFIX}{name}_count {summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def format_bytes(count):
+    for unit in ("B", "kB", "MB"):
+        if count < 1000:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1000
+    return f"{count:.1f} GB"
+
+
+def format_status(snapshot, previous, elapsed):
+    """One compact line: send/receive rates, errors, send latency, queue, reconnects, plot time."""
+    counters, gauges, histograms = snapshot["counters"], snapshot["gauges"], snapshot["histograms"]
+    old = previous["counters"] if previous else {}
+
+    def rate(name):
+        return (counters.get(name, 0) - old.get(name, 0)) / elapsed if elapsed > 0 else 0.0
+
+    errors = sum(counters.get(name, 0) for name in ("checksum_errors", "trailer_errors", "resyncs"))
+    parts = [
+        f"tx {rate('frames_sent'):.0f} f/s {format_bytes(rate('bytes_sent'))}/s",
+        f"rx {rate('frames_received'):.0f} f/s {format_bytes(rate('bytes_received'))}/s",
+        f"err {errors}",
+    ]
+    send = histograms.get("send_seconds")
+    if send:
+        parts.append(f"send p50 {send['p50'] * 1e3:.2f} p99 {send['p99'] * 1e3:.2f} ms")
+    queue = gauges.get("queue_bytes", 0) + gauges.get("write_buffer_bytes", 0)
+    parts.append(f"queue {format_bytes(queue)}")
+    if counters.get("reconnects"):
+        parts.append(f"reconnects {counters['reconnects']}")
+    plot = histograms.get("plot_frame_seconds")
+    if plot:
+        parts.append(f"plot p50 {plot['p50'] * 1e3:.1f} ms")
+    return "📊 " + " | ".join(parts)
+
+
+class StatusLine:
+    """Print format_status() every interval seconds from a background thread until stopped."""
+
+    def __init__(self, metrics=METRICS, interval=STATUS_INTERVAL, extra=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.extra = extra  # Optional callable returning more text for the end of the line
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        previous, last = self.metrics.snapshot(), time.monotonic()
+        while not self.stopped.wait(self.interval):
+            snapshot, now = self.metrics.snapshot(), time.monotonic()
+            line = format_status(snapshot, previous, now - last)
+            if self.extra:
+                line += " | " + self.extra()
+            print(line, end="\r", flush=True)
+            previous, last = snapshot, now
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+
+def serve_metrics(port, metrics=METRICS, host=METRICS_HOST):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text(metrics.snapshot()).encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Scrapes would otherwise print over the menu
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,276 @@
+"""Local stand-in for the Mazout server, for offline throughput and latency testing.
+
+Accepts connections from cli.py (or its --load mode), validates every AA BB frame
+with the same rules the CLI uses, decodes JSON, binary and delta telemetry, can push
+scripted commands back to each client and reports per-connection receive rates.
+
+    python mock_server.py --port 3050 --script commands.txt --duration 30 --report stats.json
+    python cli.py --host 127.0.0.1 --port 3050 --load 200 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from cli import FrameDecoder, decode_payload, encode_command, parse_command, telemetry_payload
+from common import DELTA_TYPE, TELEMETRY_TYPE, encode_packet, format_time_ms
+from delta import DeltaDecoder
+
+HOST = "127.0.0.1"
+PORT = 3050
+REPORT_INTERVAL = 1.0  # Seconds between aggregate status lines
+MAX_JSON_DOCUMENT = 4096  # A JSON document that still fails to parse at this size is malformed
+
+
+class JsonStream:
+    """Pick concatenated JSON documents (the 'json' wire format has no framing) out of a byte stream."""
+
+    def __init__(self):
+        self.text = ""
+        self.decoder = json.JSONDecoder()
+        self.errors = 0
+
+    def feed(self, data):
+        self.text += data.decode("utf-8", "replace")
+        documents = []
+        pos = 0
+        while True:
+            start = self.text.find("{", pos)
+            if start < 0:
+                pos = len(self.text)
+                break
+            try:
+                document, pos = self.decoder.raw_decode(self.text, start)
+            except json.JSONDecodeError:
+                if len(self.text) - start < MAX_JSON_DOCUMENT:
+                    pos = start  # Most likely cut off mid-document, wait for the rest
+                    break
+                self.errors += 1
+                pos = start + 1
+                continue
+            if isinstance(document, dict) and "time" in document:
+                documents.append(document)
+            else:
+                self.errors += 1
+        self.text = self.text[pos:]
+        return documents
+
+
+class ConnectionStats:
+    """What one client sent us."""
+
+    def __init__(self, peer):
+        self.peer = peer
+        self.started = time.perf_counter()
+        self.ended = None
+        self.bytes = 0
+        self.frames = 0
+        self.telemetry = 0  # Binary, JSON and delta telemetry records
+        self.json_errors = 0
+        self.commands_sent = 0
+        self.decoder_stats = {}
+        self.delta_stats = {}
+
+    def elapsed(self):
+        return (self.ended or time.perf_counter()) - self.started
+
+    def summary(self):
+        elapsed = self.elapsed()
+        return {
+            "peer": self.peer,
+            "seconds": round(elapsed, 3),
+            "bytes": self.bytes,
+            "frames": self.frames,
+            "telemetry": self.telemetry,
+            "bytes_per_second": round(self.bytes / elapsed, 1) if elapsed > 0 else 0.0,
+            "records_per_second": round((self.frames + self.telemetry) / elapsed, 1) if elapsed > 0 else 0.0,
+            "json_errors": self.json_errors,
+            "commands_sent": self.commands_sent,
+            "decoder": self.decoder_stats,
+            "delta": self.delta_stats,
+        }
+
+
+class MockServerProtocol(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.json = JsonStream()
+        self.decoder = FrameDecoder(on_skipped=self.on_skipped)
+        self.deltas = DeltaDecoder()
+        self.stats = None
+        self.script_task = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.transports.add(transport)
+        peer = transport.get_extra_info("peername")
+        self.stats = ConnectionStats(f"{peer[0]}:{peer[1]}" if peer else "?")
+        self.server.connections.append(self.stats)
+        if self.server.verbose:
+            print(f"🔌 {self.stats.peer} connected")
+        if self.server.script:
+            self.script_task = asyncio.ensure_future(self.push_script())
+
+    def data_received(self, data):
+        self.stats.bytes += len(data)
+        for type_code, payload in self.decoder.feed(data):
+            if type_code == DELTA_TYPE:
+                self.delta_received(payload)
+                continue
+            try:
+                decoded = decode_payload(type_code, payload)
+            except Exception as e:
+                print(f"❌ {self.stats.peer}: undecodable type {type_code} payload {payload.hex()}: {e}")
+                continue
+            if type_code == TELEMETRY_TYPE:
+                self.stats.telemetry += 1
+            else:
+                self.stats.frames += 1
+            if self.server.verbose:
+                print(f"📥 {self.stats.peer}: {decoded}")
+
+    def delta_received(self, payload):
+        block = self.deltas.feed(payload)
+        self.stats.delta_stats = self.deltas.stats()
+        if block is None:
+            return
+        self.stats.telemetry += len(block[0])
+        if self.server.verbose:
+            for epoch_ms, values in zip(block[0].tolist(), block[1].tolist()):
+                print(f"📥 {self.stats.peer}: {telemetry_payload(format_time_ms(epoch_ms), values)}")
+
+    def on_skipped(self, data):
+        for document in self.json.feed(data):
+            self.stats.telemetry += 1
+            if self.server.verbose:
+                print(f"📥 {self.stats.peer}: {document}")
+
+    def connection_lost(self, exc):
+        self.server.transports.discard(self.transport)
+        if self.script_task:
+            self.script_task.cancel()
+        self.stats.ended = time.perf_counter()
+        self.stats.json_errors = self.json.errors
+        self.stats.decoder_stats = self.decoder.stats()
+        if self.server.verbose:
+            print(f"🔌 {self.stats.peer} disconnected: {self.stats.summary()}")
+
+    async def push_script(self):
+        """Send the scripted commands, script_interval seconds apart, script_repeat times."""
+        for _ in range(self.server.script_repeat):
+            for packet in self.server.script:
+                if self.transport.is_closing():
+                    return
+                self.transport.write(packet)
+                self.stats.commands_sent += 1
+                if self.server.script_interval:
+                    await asyncio.sleep(self.server.script_interval)
+
+
+class MockServer:
+    """Asyncio TCP server speaking the AA BB protocol; keeps a ConnectionStats per client."""
+
+    def __init__(self, script=(), script_interval=0.0, script_repeat=1, verbose=False):
+        self.script = list(script)  # Encoded command frames pushed to every client
+        self.script_interval = script_interval
+        self.script_repeat = script_repeat
+        self.verbose = verbose
+        self.connections = []
+        self.transports = set()
+        self.server = None
+
+    async def start(self, host=HOST, port=PORT):
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(lambda: MockServerProtocol(self), host, port, backlog=4096)
+        return self.server
+
+    def close(self):
+        """Stop listening and drop every client, e.g. to exercise the CLI's reconnect logic."""
+        self.server.close()
+        for transport in list(self.transports):
+            transport.abort()
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    def totals(self):
+        return {
+            "connections": len(self.connections),
+            "active": sum(1 for stats in self.connections if stats.ended is None),
+            "bytes": sum(stats.bytes for stats in self.connections),
+            "frames": sum(stats.frames for stats in self.connections),
+            "telemetry": sum(stats.telemetry for stats in self.connections),
+        }
+
+    def report(self):
+        return {"totals": self.totals(), "connections": [stats.summary() for stats in self.connections]}
+
+
+def load_script(path):
+    """Encode the TYPE=VALUE lines of a script file (same syntax as cli.py --commands)."""
+    packets = []
+    with open(path) as script:
+        for number, line in enumerate(script, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                type_code, value = parse_command(line)
+                packets.append(encode_packet(type_code, encode_command(type_code, value)))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}")
+    return packets
+
+
+async def serve(args):
+    script = load_script(args.script) if args.script else []
+    server = MockServer(script, args.script_interval, args.script_repeat, args.verbose)
+    await server.start(args.host, args.port)
+    print(f"✅ Mock server listening on {args.host}:{server.port}")
+
+    started = time.perf_counter()
+    previous = server.totals()
+    try:
+        while args.duration is None or time.perf_counter() - started < args.duration:
+            await asyncio.sleep(REPORT_INTERVAL)
+            totals = server.totals()
+            records = (totals["frames"] + totals["telemetry"]) - (previous["frames"] + previous["telemetry"])
+            received = totals["bytes"] - previous["bytes"]
+            previous = totals
+            if not args.verbose:
+                print(f"⏱ {totals['active']} active / {totals['connections']} total: "
+                      f"{records / REPORT_INTERVAL:.0f} records/s, {received / REPORT_INTERVAL / 1e3:.1f} kB/s", end='\r')
+    finally:
+        server.close()
+        report = server.report()
+        print(f"\n📊 {json.dumps(report['totals'])}")
+        if args.report:
+            with open(args.report, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+            print(f"📝 Per-connection report written to {args.report}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the Mazout server")
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"port to listen on, 0 picks a free one (default {PORT})")
+    parser.add_argument("--script", metavar="FILE", help="TYPE=VALUE commands to push to every client after it connects")
+    parser.add_argument("--script-interval", type=float, default=0.0, help="seconds between scripted commands (default 0)")
+    parser.add_argument("--script-repeat", type=int, default=1, help="how many times to run the script (default 1)")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: run until Ctrl+C)")
+    parser.add_argument("--report", metavar="FILE", help="write per-connection statistics as JSON when stopping")
+    parser.add_argument("--verbose", action="store_true", help="print every decoded frame and connection event")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n⏹ Mock server stopped.")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Append-only binary log of received frames, with periodic index blocks for fast time slicing.
+
+Layout (all little-endian):
+
+    header   MAGIC (8 bytes)
+    record   b"R", receive time (float64 epoch seconds), type code (u8), payload length (u8), payload
+    index    b"I", block start offset (u64), previous index offset (u64), record count (u32),
+             first time (float64), last time (float64), INDEX_MARKER
+
+An index block follows every INDEX_EVERY records (and the last records when the recorder
+is closed) and describes the records between the previous index and itself. Blocks are
+chained backwards, so a reader finds the last index from the end of the file and never
+has to parse records outside the time range it asks for. Records written after the last
+index (a session that was killed) are still found by scanning that short tail.
+
+    python recorder.py session.mzr                      # summary
+    python recorder.py session.mzr --start 1739358801 --end "2025-02-12 16:40:00"
+"""
+import argparse
+import bisect
+import datetime
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"MZREC001"
+RECORD = struct.Struct("<cdBB")
+INDEX = struct.Struct("<cQQIdd4s")
+INDEX_MARKER = b"MZIX"
+INDEX_EVERY = 1024  # Records per index block
+FLUSH_INTERVAL = 1.0  # Seconds between flushes to disk while recording
+WRITE_BUFFER = 1024 * 1024
+
+
+class Recorder:
+    """Append received frames to path; reopening an existing recording continues it."""
+
+    def __init__(self, path, index_every=INDEX_EVERY, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.index_every = index_every
+        self.flush_interval = flush_interval
+        self.previous_index = 0
+        end = len(MAGIC)
+        # Records after the last index of an existing file go into our first block
+        tail = (end, 0, 0.0, 0.0)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with RecordingReader(path) as reader:
+                end, self.previous_index, tail = reader.end, reader.last_index, reader.tail
+            with open(path, "r+b") as log:
+                log.truncate(end)  # Drop a half-written record left by a crash
+        else:
+            with open(path, "wb") as log:
+                log.write(MAGIC)
+        self.file = open(path, "ab", buffering=WRITE_BUFFER)
+        self.offset = end
+        self.block_start, self.count, self.first_time, self.last_time = tail
+        self.records = 0
+        self.last_flush = time.monotonic()
+        self.flush_timer = None  # Pending flush scheduled by schedule_flush()
+
+    def record(self, type_code, payload, received=None):
+        received = time.time() if received is None else received
+        if self.count == 0:
+            self.first_time = received
+        self.last_time = received
+        self.file.write(RECORD.pack(b"R", received, type_code, len(payload)))
+        self.file.write(payload)
+        self.offset += RECORD.size + len(payload)
+        self.count += 1
+        self.records += 1
+        if self.count >= self.index_every:
+            self._write_index()
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _write_index(self):
+        if not self.count:
+            return
+        self.file.write(INDEX.pack(b"I", self.block_start, self.previous_index, self.count,
+                                   self.first_time, self.last_time, INDEX_MARKER))
+        self.previous_index = self.offset
+        self.offset += INDEX.size
+        self.block_start = self.offset
+        self.count = 0
+
+    def schedule_flush(self, loop):
+        """Flush within flush_interval from loop's thread, even if no further frame arrives to do it."""
+        if self.flush_timer is None:
+            self.flush_timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        if self.flush_timer:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.flush_timer:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        self._write_index()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingReader:
+    """Memory-map a recording and read records by time range."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a frame recording")
+
+        # (start, end, count, first time, last time) per block, oldest first
+        self.blocks = []
+        self.last_index = 0
+        index = self._find_last_index(size)
+        while index:
+            _, start, previous, count, first, last, _ = INDEX.unpack_from(self.map, index)
+            self.blocks.append((start, index, count, first, last))
+            self.last_index = self.last_index or index
+            index = previous if previous < index else 0  # Chains only point backwards
+        self.blocks.reverse()
+
+        # Records after the last index block, e.g. when the recorder was killed
+        tail_start = self.last_index + INDEX.size if self.last_index else len(MAGIC)
+        self.end = tail_start
+        count, first, last = 0, 0.0, 0.0
+        for received, _, _, end in self._scan(tail_start, size):
+            first = received if not count else first
+            last, count, self.end = received, count + 1, end
+        self.tail = (tail_start, count, first, last)
+        if count:
+            self.blocks.append((tail_start, self.end, count, first, last))
+        self.first_times = [block[3] for block in self.blocks]
+
+    def _find_last_index(self, size):
+        pos = size
+        while True:
+            pos = self.map.rfind(INDEX_MARKER, len(MAGIC), pos)
+            if pos < 0:
+                return 0
+            index = pos + len(INDEX_MARKER) - INDEX.size
+            if index >= len(MAGIC):
+                tag, start, previous, _, _, _, _ = INDEX.unpack_from(self.map, index)
+                if tag == b"I" and len(MAGIC) <= start <= index and previous < index:
+                    return index
+            pos += len(INDEX_MARKER) - 1  # The marker matched inside a payload, keep looking
+
+    def _scan(self, pos, end):
+        """Yield (time, type code, payload, next offset) for the complete records in [pos, end)."""
+        view = self.map
+        while pos + RECORD.size <= end:
+            tag, received, type_code, length = RECORD.unpack_from(view, pos)
+            if tag != b"R" or pos + RECORD.size + length > end:
+                return
+            payload_start = pos + RECORD.size
+            pos = payload_start + length
+            yield received, type_code, view[payload_start:pos], pos
+
+    def records(self, start=None, end=None):
+        """Yield (receive time, type code, payload) for records with start <= time <= end."""
+        first_block = max(bisect.bisect_right(self.first_times, start) - 1, 0) if start is not None else 0
+        for block_start, block_end, _, first, last in self.blocks[first_block:]:
+            if end is not None and first > end:
+                break
+            if start is not None and last < start:
+                continue
+            for received, type_code, payload, _ in self._scan(block_start, block_end):
+                if (start is None or received >= start) and (end is None or received <= end):
+                    yield received, type_code, payload
+
+    def __iter__(self):
+        return self.records()
+
+    def __len__(self):
+        return sum(block[2] for block in self.blocks)
+
+    def time_range(self):
+        if not self.blocks:
+            return None
+        return self.blocks[0][3], max(block[4] for block in self.blocks)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_time(value):
+    """Epoch seconds, or a local 'YYYY-MM-DD HH:MM:SS[.fff]' time."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a frame recording made with cli.py --record")
+    parser.add_argument("path")
+    parser.add_argument("--start", type=parse_time, help="first receive time to print (epoch seconds or local time)")
+    parser.add_argument("--end", type=parse_time, help="last receive time to print")
+    parser.add_argument("--raw", action="store_true", help="print payloads as hex instead of decoding them")
+    args = parser.parse_args(argv)
+
+    with RecordingReader(args.path) as reader:
+        time_range = reader.time_range()
+        if not time_range:
+            print(f"{args.path}: empty recording")
+            return
+        first, last = (datetime.datetime.fromtimestamp(t) for t in time_range)
+        print(f"{args.path}: {len(reader)} frames in {len(reader.blocks)} blocks, {first} → {last}")
+        if args.start is None and args.end is None:
+            return
+        from cli import decode_payload
+
+        for received, type_code, payload in reader.records(args.start, args.end):
+            shown = payload.hex() if args.raw else decode_payload(type_code, payload)
+            print(f"{datetime.datetime.fromtimestamp(received)}  {type_code:3d}  {shown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,30 @@
+import argparse
 import csv
 import math
+import os
+import sys
+import time
 from datetime import datetime, timedelta
 import random
 
+FIELDNAMES = ['Time', 'Bus_Voltage', 'Bus_Current', 'RPM', 'Torque',
+              'Current_U', 'Current_V', 'Current_W', 'Throttle_Voltage', 'SOC']
+BLOCK_ROWS = 65536  # Rows computed per block by the vectorized engine, bounds memory use
+NOISE_FACTOR = 0.02
+
+# (min, max, frequency, phase, decimals) per column after Time, same waves as generate_sensor_data()
+SIGNALS = [
+    (85, 95, 0.03, 0, 2),                  # Bus_Voltage, centered around 90V
+    (-20, 120, 0.08, 0, 2),                # Bus_Current
+    (0, 2500, 0.05, 0, 0),                 # RPM
+    (0, 190, 0.06, 0, 2),                  # Torque
+    (-20, 120, 0.08, 0, 2),                # Current_U
+    (-20, 120, 0.08, 2 * math.pi / 3, 2),  # Current_V, 120° behind U
+    (-20, 120, 0.08, 4 * math.pi / 3, 2),  # Current_W, 240° behind U
+    (0, 5, 0.02, 0, 2),                    # Throttle_Voltage
+    (20, 100, 0.01, 0, 1),                 # SOC, starting from 20% to be realistic
+]
+
 def generate_sine_wave(min_val, max_val, time_step, frequency=0.1, phase=0):
     """Generate a sine wave between min and max values."""
     mid = (max_val + min_val) / 2
@@ -72,8 +94,103 @@ def save_to_csv(data, filename='sensor_data.csv'):
         writer.writeheader()
         writer.writerows(data)
 
+def generate_blocks(duration_seconds=1000, sample_rate_hz=10, vehicles=1, seed=None, start_time=None, block_rows=BLOCK_ROWS):
+    """Vectorized version of generate_sensor_data(), yielding the samples block by block.
+
+    Each block is (sample_index, epoch_ms, values): sample_index and epoch_ms have one entry
+    per sample and values has shape (samples, vehicles, 9) in FIELDNAMES[1:] order. Every
+    vehicle runs the same waves with its own phase offset and noise. Only one block is in
+    memory at a time, so the total size is limited by disk space, not RAM.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    start_time = start_time or datetime.now()
+    start_ms = (start_time - datetime(1970, 1, 1)) // timedelta(milliseconds=1)  # Naive, like the CSV
+    lows, highs, frequencies, phases, decimals = (np.array(column, dtype=np.float64) for column in zip(*SIGNALS))
+    mids, amplitudes = (highs + lows) / 2, (highs - lows) / 2
+    vehicle_phase = np.arange(vehicles)[:, None] * 2 * math.pi / (1 + math.sqrt(5))  # Spread vehicles apart
+    scale = 10.0 ** decimals
+
+    total = int(duration_seconds * sample_rate_hz)
+    samples_per_block = max(block_rows // vehicles, 1)
+    for first in range(0, total, samples_per_block):
+        sample_index = np.arange(first, min(first + samples_per_block, total))
+        time_step = sample_index / sample_rate_hz
+        angle = 2 * math.pi * frequencies * time_step[:, None, None] + phases + vehicle_phase
+        values = mids + amplitudes * np.sin(angle)
+        values *= 1 + rng.uniform(-NOISE_FACTOR, NOISE_FACTOR, values.shape)  # Add some noise
+        values = np.round(values * scale) / scale
+        epoch_ms = start_ms + np.round(time_step * 1000).astype(np.int64)
+        yield sample_index, epoch_ms, values
+
+def write_csv_blocks(blocks, filename, vehicles=1):
+    """Stream generated blocks to one CSV file; a Vehicle column is added for fleets."""
+    import numpy as np
+
+    from cli import format_times_ms
+
+    # Fixed decimals per column (e.g. 90.50) format about twice as fast as repr()
+    value_formats = ["%d" if signal[4] == 0 else f"%.{signal[4]}f" for signal in SIGNALS]
+    row_format = "%s," + ("%d," if vehicles > 1 else "") + ",".join(value_formats) + "\n"
+    rows = 0
+    with open(filename, 'w', newline='') as csvfile:
+        csvfile.write(",".join(FIELDNAMES[:1] + (["Vehicle"] if vehicles > 1 else []) + FIELDNAMES[1:]) + "\n")
+        for _, epoch_ms, values in blocks:
+            # One (time, [vehicle,] values...) tuple per output row, then a single write per block
+            columns = [np.repeat(format_times_ms(epoch_ms), vehicles).tolist()]
+            if vehicles > 1:
+                columns.append(np.tile(np.arange(1, vehicles + 1), len(epoch_ms)).tolist())
+            columns += values.reshape(-1, values.shape[2]).T.tolist()
+            csvfile.write("".join([row_format % row for row in zip(*columns)]))
+            rows += values.shape[0] * values.shape[1]
+    return rows
+
+def write_binary_blocks(blocks, filename, vehicles=1):
+    """Stream generated blocks as framed binary telemetry records (the CLI's 'binary' wire format).
+
+    The record has no vehicle field, so a fleet is written as one file per vehicle
+    (name_001.bin, name_002.bin, ...).
+    """
+    from cli import encode_telemetry_block
+
+    if vehicles > 1:
+        stem, extension = os.path.splitext(filename)
+        filenames = [f"{stem}_{vehicle + 1:03d}{extension}" for vehicle in range(vehicles)]
+    else:
+        filenames = [filename]
+    files = [open(name, 'wb') for name in filenames]
+    rows = 0
+    try:
+        for _, epoch_ms, values in blocks:
+            for vehicle, binfile in enumerate(files):
+                binfile.write(encode_telemetry_block(epoch_ms, values[:, vehicle]))
+            rows += values.shape[0] * values.shape[1]
+    finally:
+        for binfile in files:
+            binfile.close()
+    return rows
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic motor controller telemetry")
+    parser.add_argument("--duration", type=float, default=1000, help="seconds of data per vehicle (default 1000)")
+    parser.add_argument("--rate", type=float, default=10, help="samples per second (default 10)")
+    parser.add_argument("--vehicles", type=int, default=1, help="number of simulated vehicles (default 1)")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible output")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="time of the first sample, 'YYYY-MM-DD HH:MM:SS' (default now)")
+    parser.add_argument("--format", choices=("csv", "binary"), default="csv", help="output format (default csv)")
+    parser.add_argument("--output", help="output file (default sensor_data.csv or sensor_data.bin)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    # Generate data for 1000 seconds at 10Hz sample rate
-    sensor_data = generate_sensor_data(duration_seconds=1000, sample_rate_hz=10)
-    save_to_csv(sensor_data)
-    print(f"Generated {len(sensor_data)} data points")
+    args = parse_args()
+    if args.vehicles < 1 or args.rate <= 0 or args.duration <= 0:
+        sys.exit("❌ --vehicles, --rate and --duration must be positive")
+    output = args.output or ("sensor_data.csv" if args.format == "csv" else "sensor_data.bin")
+    blocks = generate_blocks(args.duration, args.rate, args.vehicles, args.seed, args.start)
+    started = time.perf_counter()
+    if args.format == "csv":
+        rows = write_csv_blocks(blocks, output, args.vehicles)
+    else:
+        rows = write_binary_blocks(blocks, output, args.vehicles)
+    print(f"Generated {rows} data points in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,59 @@
+"""Tests for the streaming statistics in analytics.py, against pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import AlarmRule, Ewma, RollingWindow
+
+CHUNKS = [1, 7, 93, 100, 3, 250, 46]  # Uneven chunks that straddle block boundaries
+
+
+def stream():
+    rng = np.random.default_rng(3)
+    rows = sum(CHUNKS)
+    return np.column_stack([rng.normal(90, 5, rows), np.cumsum(rng.normal(size=rows)), np.sin(np.arange(rows) / 9)])
+
+
+def feed(update, x):
+    out, pos = [], 0
+    for size in CHUNKS:
+        out.append(update(x[pos:pos + size]))
+        pos += size
+    return out
+
+
+@pytest.mark.parametrize("width", [1, 10, 100])
+def test_rolling_window_matches_pandas(width):
+    x = stream()
+    results = feed(RollingWindow(width, x.shape[1]).update, x)
+    rolling = pd.DataFrame(x).rolling(width, min_periods=1)
+    expected = {
+        "mean": rolling.mean(),
+        "std": rolling.std(ddof=0),  # Population std, 0 for a single row
+        "min": rolling.min(),
+        "max": rolling.max(),
+    }
+    for name, frame in expected.items():
+        got = np.concatenate([result[name] for result in results])
+        assert np.allclose(got, frame.to_numpy(), rtol=0, atol=1e-6), name
+
+
+@pytest.mark.parametrize("alpha", [0.05, 0.5, 1.0])
+def test_ewma_matches_pandas(alpha):
+    x = stream()
+    got = np.concatenate(feed(Ewma(alpha).update, x))
+    expected = pd.DataFrame(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    assert np.allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_ewma_rejects_bad_alpha():
+    with pytest.raises(ValueError):
+        Ewma(0)
+
+
+def test_alarm_rule_hysteresis_across_chunks():
+    rule = AlarmRule("Bus_Voltage<84~1")
+    raised, cleared = rule.evaluate(np.array([90, 83, 84.5, 83.5]))
+    assert raised.tolist() == [1] and cleared.tolist() == []  # 84.5 is inside the hysteresis band
+    raised, cleared = rule.evaluate(np.array([85, 83]))
+    assert raised.tolist() == [1] and cleared.tolist() == [0]
@@ -0,0 +1,127 @@
+"""Tests for the frame codec in cli.py."""
+from cli import FrameDecoder, encode_packet
+
+FRAMES = [(6, b"\x04\xb0"), (3, b"28.613939,77.209023"), (5, b"\x5a\x32"), (3, b"x" * 255)]
+STREAM = b"".join(encode_packet(type_code, payload) for type_code, payload in FRAMES)
+
+
+def test_frame_decoder_coalesced():
+    decoder = FrameDecoder()
+    assert decoder.feed(STREAM) == FRAMES
+    assert decoder.stats()["frames"] == len(FRAMES)
+
+
+def test_frame_decoder_split_at_every_byte():
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(len(STREAM)):
+        frames += decoder.feed(STREAM[i:i + 1])
+    assert frames == FRAMES
+    assert decoder.stats()["resyncs"] == 0
+
+
+def test_frame_decoder_corrupt_frames_are_skipped():
+    good = encode_packet(6, b"\x04\xb0")
+    bad_checksum = bytearray(good)
+    bad_checksum[-2] ^= 0xFF
+    bad_trailer = bytearray(good)
+    bad_trailer[-1] = 0x00
+    skipped = []
+    decoder = FrameDecoder(on_skipped=skipped.append)
+    frames = decoder.feed(b"noise" + bytes(bad_checksum) + good + bytes(bad_trailer) + good)
+    assert frames == [(6, b"\x04\xb0")] * 2
+    stats = decoder.stats()
+    assert stats["checksum_errors"] == 1
+    assert stats["trailer_errors"] == 1
+    assert b"".join(skipped).startswith(b"noise")
+
+
+def test_frame_decoder_keeps_partial_sync_marker():
+    decoder = FrameDecoder()
+    frame = encode_packet(7, b"\x00\x2d")
+    assert decoder.feed(b"junk" + frame[:1]) == []
+    assert decoder.feed(frame[1:]) == [(7, b"\x00\x2d")]
+
+
+def test_encode_command_keeps_the_typed_split():
+    from cli import encode_command
+
+    assert encode_command(4, "12.13") == b"\x0c\x0d"
+    assert encode_command(4, "12.5") == b"\x0c\x05"  # The digits after the point, as typed
+    assert encode_command(5, "-1.50") == b"\xff\x32"
+    assert encode_command(6, "1200") == b"\x04\xb0"
+    assert encode_command(6, "-5") == b"\xff\xfb"
+    assert encode_command(3, "28.6,77.2") == b"28.6,77.2"
+
+
+def test_encode_values_matches_per_value_encoding():
+    import numpy as np
+
+    from cli import decode_values, encode_command, encode_values
+
+    rng = np.random.default_rng(1)
+    fixed = np.round(rng.uniform(-127.5, 127.5, 2000), 2)
+    cases = {
+        4: fixed[(fixed <= -1) | (fixed >= 0)],
+        6: rng.integers(-32768, 32768, 2000),
+    }
+    for type_code, values in cases.items():
+        blob = encode_values(type_code, values)
+        assert blob == b"".join(encode_packet(type_code, encode_command(type_code, value)) for value in values.tolist())
+        assert np.array_equal(decode_values(type_code, blob), values)
+
+
+def test_numbers_between_minus_one_and_zero_are_refused():
+    import pytest
+
+    from cli import encode_command, encode_values
+
+    # The sign rides on the whole byte, so -0.5 would go out as +0.5
+    for value in (-0.5, -0.01, -0.99):
+        with pytest.raises(ValueError):
+            encode_values(4, [1.0, value])
+        with pytest.raises(ValueError):
+            encode_command(4, value)
+    assert encode_command(4, "-0.5") == b"\x00\x05"  # Typed text keeps the legacy split
+
+
+def test_decode_payload_agrees_with_decode_values():
+    import numpy as np
+
+    from cli import decode_payload, decode_values, encode_values
+
+    values = np.array([12.13, -1.5, 0.99, 127.99, -128.0])
+    blob = encode_values(5, values)
+    singles = [decode_payload(type_code, payload)["payload"] for type_code, payload in FrameDecoder().feed(blob)]
+    assert singles == decode_values(5, blob).tolist() == values.tolist()
+
+
+def test_decode_values_rejects_corrupt_frames():
+    import pytest
+
+    from cli import decode_values, encode_values
+
+    blob = bytearray(encode_values(6, [1, 2, 3]))
+    blob[10] ^= 1
+    with pytest.raises(ValueError):
+        decode_values(6, bytes(blob))
+
+
+def test_decode_payload_never_raises_on_malformed_payloads():
+    from cli import decode_payload
+
+    for type_code, payload in ((6, b"\x01"), (4, b"\x01\x02\x03"), (3, b"\xff\xfe"), (13, b"\x00")):
+        decoded = decode_payload(type_code, payload)
+        assert decoded["payload"] == payload.hex()
+        assert "error" in decoded
+
+
+def test_types_without_an_encoding_are_refused():
+    import pytest
+
+    from cli import encode_command, parse_command
+
+    for command in ("immobilize=1", "2=1500"):
+        type_code, value = parse_command(command)
+        with pytest.raises(ValueError, match="no defined encoding"):
+            encode_command(type_code, value)
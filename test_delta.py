@@ -0,0 +1,92 @@
+"""Tests for the delta telemetry stream in delta.py."""
+import numpy as np
+import pytest
+
+from cli import FrameDecoder, synthesize_rows
+from delta import FIELD_SCALES, DeltaDecoder, check_compression, encode_stream_rows
+
+
+def quantized(values):
+    return np.rint(values * FIELD_SCALES[1:]) / FIELD_SCALES[1:]
+
+
+def frames_of(packets):
+    return FrameDecoder().feed(b"".join(packets))
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_round_trip(compression):
+    epoch_ms, values = synthesize_rows(237)
+    decoder = DeltaDecoder()
+    blocks = [decoder.feed(payload) for _, payload in frames_of(encode_stream_rows(epoch_ms, values, compression))]
+    blocks = [block for block in blocks if block is not None]
+    assert len(blocks) == 5  # 4 full blocks of 50 rows and one of 37
+    assert np.array_equal(np.concatenate([ms for ms, _ in blocks]), epoch_ms)
+    assert np.allclose(np.concatenate([rows for _, rows in blocks]), quantized(values), rtol=0, atol=1e-9)
+    assert decoder.stats() == {"blocks": 5, "rows": 237, "dropped_blocks": 0}
+
+
+def test_only_the_last_row_of_a_block_carries_frames():
+    epoch_ms, values = synthesize_rows(120)
+    packets = encode_stream_rows(epoch_ms, values)
+    assert [i for i, packet in enumerate(packets) if packet] == [49, 99, 119]
+
+
+def test_lost_fragment_drops_only_its_block():
+    epoch_ms, values = synthesize_rows(150)
+    frames = frames_of(encode_stream_rows(epoch_ms, values, "none"))
+    assert len(frames) > 3  # Uncompressed blocks need several fragments
+    decoder = DeltaDecoder()
+    first_block = [i for i, (_, payload) in enumerate(frames) if payload[2] == 0]
+    lost = first_block[1] + 1  # Second fragment of the second block
+    rows = [decoder.feed(payload) for i, (_, payload) in enumerate(frames) if i != lost]
+    rows = [ms for block in rows if block is not None for ms in block[0]]
+    assert rows == list(epoch_ms[:50]) + list(epoch_ms[100:])
+    assert decoder.stats()["dropped_blocks"] == 1
+
+
+def test_undecodable_block_is_counted_and_the_stream_continues():
+    epoch_ms, values = synthesize_rows(100)
+    frames = frames_of(encode_stream_rows(epoch_ms, values, "zlib"))
+    corrupt = bytearray(frames[0][1])
+    corrupt[4] = 2  # Claims lz4, which is either missing or can't read a zlib stream
+    decoder = DeltaDecoder()
+    results = [decoder.feed(bytes(corrupt))] + [decoder.feed(payload) for _, payload in frames[1:]]
+    assert [len(block[0]) for block in results if block is not None] == [50]
+    assert decoder.stats()["dropped_blocks"] == 1
+    assert len(decoder.errors) == 1
+
+
+def test_short_fragment_is_dropped():
+    decoder = DeltaDecoder()
+    assert decoder.feed(b"\x00") is None
+    assert decoder.stats()["dropped_blocks"] == 1
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError):
+        check_compression("gzip")
+
+
+def test_missing_blocks_are_counted_from_the_sequence_gap():
+    epoch_ms, values = synthesize_rows(250)
+    frames = frames_of(encode_stream_rows(epoch_ms, values))
+    sequences = sorted({payload[:2] for _, payload in frames})
+    assert len(sequences) == 5
+    decoder = DeltaDecoder()
+    for _, payload in frames:
+        if payload[:2] not in sequences[1:3]:  # Blocks 1 and 2 are lost whole
+            decoder.feed(payload)
+    assert decoder.stats() == {"blocks": 3, "rows": 150, "dropped_blocks": 2}
+
+
+def test_sequence_wraparound_and_restart_are_not_losses():
+    from delta import encode_block, fragment
+
+    epoch_ms, values = synthesize_rows(50)
+    block = encode_block(epoch_ms, values)
+    decoder = DeltaDecoder()
+    for sequence in (65534, 65535, 0, 1, 0):  # Wraps the u16 counter, then starts over
+        for _, payload in frames_of(fragment(block, sequence)):
+            decoder.feed(payload)
+    assert decoder.stats() == {"blocks": 5, "rows": 250, "dropped_blocks": 0}
@@ -0,0 +1,56 @@
+"""Tests for the min/max plot history in history.py."""
+import numpy as np
+import pytest
+
+from history import HistoryStore
+
+
+def brute_force_buckets(values, x, window):
+    """Min and max of the raw rows behind each bucket, with bucket bounds recovered from x."""
+    start = len(values) - window
+    lows, highs = [], []
+    bucket_start = start
+    for centre in x:
+        bucket_stop = int(round(2 * (centre * (window - 1) + start) + 1)) - bucket_start
+        rows = values[bucket_start:bucket_stop]
+        lows.append(rows.min(axis=0))
+        highs.append(rows.max(axis=0))
+        bucket_start = bucket_stop
+    assert bucket_start == len(values)  # Buckets cover the window exactly
+    return np.array(lows), np.array(highs)
+
+
+@pytest.mark.parametrize("count, window, bulk", [
+    (1000, None, True),
+    (5000, None, False),  # Wraps the 4096-row ring
+    (5000, 3001, True),  # Window that doesn't start on a block boundary
+    (70, 70, False),
+])
+def test_view_matches_brute_force(count, window, bulk):
+    window = window or min(count, 4096)
+    rng = np.random.default_rng(count)
+    values = rng.normal(size=(count, 2))
+    values[count - 3, 0] = 50  # Spikes at both ends of the window
+    values[count - window + 1, 1] = -50
+    store = HistoryStore(["a", "b"], capacity=4096)
+    if bulk:
+        store.append(np.arange(count), values)
+    else:
+        for i, row in enumerate(values):
+            store.append_row(i, row)
+    kept = values[-min(count, 4096):]
+    x, lows, highs = store.view(64, window)
+    assert x[0] >= 0 and x[-1] <= 1 and np.all(np.diff(x) > 0)
+    expected_lows, expected_highs = brute_force_buckets(kept, x, window)
+    assert np.array_equal(lows, expected_lows)
+    assert np.array_equal(highs, expected_highs)
+    assert highs[:, 0].max() == 50 and lows[:, 1].min() == -50
+
+
+def test_short_window_returns_raw_rows():
+    store = HistoryStore(["a"], capacity=16)
+    store.append(np.arange(5), np.arange(5.0)[:, None])
+    x, lows, highs = store.view(64)
+    assert x.tolist() == [0, 0.25, 0.5, 0.75, 1]
+    assert lows[:, 0].tolist() == highs[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert store.times_at([0, 1]) == [0, 4]
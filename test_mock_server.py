@@ -0,0 +1,115 @@
+"""Loopback smoke test: the CLI's connection against mock_server.py."""
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+import cli
+from cli import AsyncConnection, FrameDecoder, encode_command, encode_packet, encode_rows, format_time_ms, synthesize_rows
+from mock_server import MockServer, MockServerProtocol
+
+TIMEOUT = 5.0
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the mock server"
+        time.sleep(0.005)
+
+
+def run(loop, coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def close(loop, server):
+    """MockServer.close() on the server's own loop, which transports require."""
+    async def closed():
+        server.close()
+
+    run(loop, closed())
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+@pytest.fixture
+def server(loop):
+    server = MockServer(script=[encode_packet(6, encode_command(6, "1200"))])
+    run(loop, server.start("127.0.0.1", 0))
+    yield server
+    close(loop, server)
+
+
+def test_loopback_every_wire_format(server):
+    received = []
+    client = AsyncConnection(socket.create_connection(("127.0.0.1", server.port)), reconnect=False)
+    client.set_frame_handler(lambda type_code, payload: received.append((type_code, payload)))
+    try:
+        epoch_ms, values = synthesize_rows(60)
+        times = [format_time_ms(ms) for ms in epoch_ms.tolist()]
+        for wire_format, rows in (("json", slice(0, 5)), ("binary", slice(5, 10)), ("delta", slice(0, 60))):
+            for packet in encode_rows(times[rows], epoch_ms[rows], values[rows], wire_format):
+                if packet:
+                    client.sendall(packet)
+        client.sendall(encode_packet(6, encode_command(6, "-5")))
+        client.sendall(encode_packet(3, encode_command(3, "28.613939,77.209023")))
+
+        wait_for(lambda: server.totals()["telemetry"] == 70 and server.totals()["frames"] == 2)
+        wait_for(lambda: received)
+        assert received == [(6, b"\x04\xb0")]  # The scripted command reached the client
+        assert server.connections[0].delta_stats == {"blocks": 2, "rows": 60, "dropped_blocks": 0}
+    finally:
+        client.close()
+    wait_for(lambda: server.totals()["active"] == 0)
+    stats = server.connections[0]  # Filled in when the connection closes
+    assert stats.json_errors == 0
+    assert stats.decoder_stats["checksum_errors"] == 0
+
+
+def test_reconnect_delivers_the_offline_queue_in_order(loop, monkeypatch):
+    received = bytearray()
+    data_received = MockServerProtocol.data_received
+
+    def capture(protocol, data):
+        received.extend(data)
+        data_received(protocol, data)
+
+    monkeypatch.setattr(MockServerProtocol, "data_received", capture)
+    frames = [encode_packet(6, encode_command(6, str(i))) for i in range(30)]
+    monkeypatch.setattr(cli, "OUTBOUND_QUEUE_BYTES", 10 * len(frames[0]))  # Room for ten frames
+
+    server = MockServer()
+    run(loop, server.start("127.0.0.1", 0))
+    port = server.port
+    client = AsyncConnection(socket.create_connection(("127.0.0.1", port)))
+    try:
+        for frame in frames[:5]:
+            client.sendall(frame)
+        wait_for(lambda: server.totals()["frames"] == 5)
+
+        close(loop, server)  # Drop the link and stop listening
+        wait_for(lambda: not client.connected)
+        for frame in frames[5:]:
+            client.sendall(frame)  # Queued, never blocks
+        assert client.queued_bytes == 10 * len(frames[0])
+        assert client.dropped_bytes == 15 * len(frames[0])  # The oldest went first
+
+        run(loop, server.start("127.0.0.1", port))
+        wait_for(lambda: client.connected and server.totals()["frames"] == 15)
+        assert client.reconnects == 1
+        assert client.queued_bytes == 0
+    finally:
+        client.close()
+        close(loop, server)
+    values = [int.from_bytes(payload, "big", signed=True) for _, payload in FrameDecoder().feed(bytes(received))]
+    assert values == list(range(5)) + list(range(20, 30))
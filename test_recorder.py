@@ -0,0 +1,75 @@
+"""Tests for the frame recording in recorder.py."""
+from recorder import RECORD, Recorder, RecordingReader
+
+T0 = 1739358800.0
+
+
+def write(recorder, first, count):
+    for i in range(first, first + count):
+        recorder.record(6, i.to_bytes(2, "big"), received=T0 + i)
+
+
+def numbers(reader, start=None, end=None):
+    return [int.from_bytes(payload, "big") for _, _, payload in reader.records(start, end)]
+
+
+def crash(recorder):
+    """Lose the recorder as a killed process would: no closing index block, half a record at the end."""
+    recorder.flush()
+    recorder.file.close()
+    with open(recorder.path, "ab") as log:
+        log.write(RECORD.pack(b"R", T0, 6, 2)[:7])
+
+
+def test_records_and_time_ranges(tmp_path):
+    path = tmp_path / "session.mzr"
+    with Recorder(path, index_every=8) as recorder:
+        write(recorder, 0, 50)
+    with RecordingReader(path) as reader:
+        assert len(reader) == 50
+        assert reader.time_range() == (T0, T0 + 49)
+        assert numbers(reader) == list(range(50))
+        assert numbers(reader, T0 + 7, T0 + 17) == list(range(7, 18))
+        assert numbers(reader, T0 + 60) == []
+
+
+def test_crash_and_reopen_recovers_every_record(tmp_path):
+    path = tmp_path / "session.mzr"
+    recorder = Recorder(path, index_every=8)
+    write(recorder, 0, 21)  # Two index blocks and a 5-record tail
+    crash(recorder)
+    with RecordingReader(path) as reader:
+        assert numbers(reader) == list(range(21))  # The half record is ignored
+
+    with Recorder(path, index_every=8) as recorder:  # Continues the recording
+        write(recorder, 21, 10)
+    with RecordingReader(path) as reader:
+        assert len(reader) == 31
+        assert numbers(reader) == list(range(31))
+        assert numbers(reader, T0 + 18, T0 + 24) == list(range(18, 25))
+
+
+def test_flush_makes_records_readable_while_recording(tmp_path):
+    path = tmp_path / "session.mzr"
+    with Recorder(path) as recorder:
+        write(recorder, 0, 3)
+        recorder.flush()
+        with RecordingReader(path) as reader:
+            assert numbers(reader) == [0, 1, 2]
+
+
+def test_scheduled_flush_runs_without_further_records(tmp_path):
+    import asyncio
+
+    path = tmp_path / "session.mzr"
+
+    async def idle_after_one_record():
+        recorder.record(6, b"\x00\x01", received=T0)
+        recorder.schedule_flush(asyncio.get_running_loop())
+        await asyncio.sleep(0.2)
+
+    with Recorder(path, flush_interval=0.05) as recorder:
+        recorder.last_flush = float("inf")  # Only the timer may flush
+        asyncio.run(idle_after_one_record())
+        with RecordingReader(path) as reader:
+            assert numbers(reader) == [1]